@@ -9,4 +9,6 @@
 #
 ##############################################################################
 
+from . import controllers
 from . import models
+from . import wizard
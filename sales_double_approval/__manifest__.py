@@ -10,7 +10,7 @@
 
 {
     'name': 'Sales Order Double Approval',
-    'version': '18.0.0.0',
+    'version': '18.0.1.6',
     'category': 'Sales',
     "license": "OPL-1",
     'author': 'Wan Buffer Services',
@@ -28,12 +28,21 @@
     """,
     'depends': ['base', 'sale_management'],
     'data': [
+        'security/ir.model.access.csv',
+        'security/sale_approval_security.xml',
         'data/mail_activity.xml',
+        'data/approval_mail_layout.xml',
         'data/email_template.xml',
+        'data/ir_cron.xml',
         'views/res_company_views.xml',
+        'views/sale_approval_rule_views.xml',
+        'views/sale_approval_delegation_views.xml',
+        'views/sale_approval_log_views.xml',
+        'views/sale_approval_dashboard_views.xml',
         'views/res_config_settings_views.xml',
         'views/approval_menu.xml',
-        'views/sale_order_views.xml'
+        'views/sale_order_views.xml',
+        'wizard/sale_approval_wizard_views.xml',
     ],
     'application': True,
     'installable': True,
@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    OpenERP, Open Source Management Solution
+#    Copyright (C) Wan Buffer Solution (<https://wanbuffer.com/>).
+#
+#    For Module Support : info@wanbuffer.com or Call : +91 9638442270
+#
+##############################################################################
+
+from . import main
+from . import api
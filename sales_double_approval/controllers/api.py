@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    OpenERP, Open Source Management Solution
+#    Copyright (C) Wan Buffer Solution (<https://wanbuffer.com/>).
+#
+#    For Module Support : info@wanbuffer.com or Call : +91 9638442270
+#
+##############################################################################
+
+from odoo import http
+from odoo.http import request
+
+# Orders returned per page of pending approvals, by default and at most
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# Fields of an order in the pending approvals listing
+PENDING_SPECIFICATION = {
+    'name': {},
+    'partner_id': {'fields': {'display_name': {}}},
+    'user_id': {'fields': {'display_name': {}}},
+    'amount_total': {},
+    'currency_id': {'fields': {'display_name': {}, 'symbol': {}}},
+    'date_order': {},
+    'approval_level': {},
+    'approval_request_date': {},
+    'approval_claimed_by_id': {'fields': {'display_name': {}}},
+}
+
+
+class SaleApprovalApi(http.Controller):
+    """Lightweight approval endpoints for mobile clients: the pending
+    approvals of the user and batch approve / reject, without loading the
+    sale order views"""
+
+    @http.route('/sale_approval/api/pending', type='http', auth='user',
+                methods=['GET'], readonly=True)
+    def pending(self, after=0, limit=PAGE_SIZE):
+        """Page of the orders waiting for the approval of the user, in id
+        order: pass the ``next`` value of a page as ``after`` to get the
+        next one.
+
+        The response carries an ETag derived from the version of the
+        approval queues (see ``sale.order._bump_approval_queue_version``):
+        a client polling with ``If-None-Match`` gets an empty 304 response,
+        costing one query, as long as no queue changed.
+        """
+        try:
+            after = int(after)
+            limit = min(max(int(limit), 1), MAX_PAGE_SIZE)
+        except ValueError:
+            return request.make_json_response(
+                {'error': "'after' and 'limit' must be integers"}, status=400)
+        SaleOrder = request.env['sale.order']
+        etag = "%s-%s-%s-%s-%s" % (
+            SaleOrder._get_approval_queue_version(), request.env.uid,
+            '.'.join(map(str, request.env.companies.ids)), after, limit)
+        headers = [('ETag', '"%s"' % etag), ('Cache-Control', 'private, no-cache')]
+        if request.httprequest.if_none_match.contains(etag):
+            return request.make_response('', headers=headers, status=304)
+
+        orders = SaleOrder.search_fetch([
+            ('state', '=', 'to_approve'),
+            ('can_approve', '=', True),
+            ('id', '>', after),
+        ], list(PENDING_SPECIFICATION), order='id', limit=limit)
+        return request.make_json_response({
+            'orders': orders.web_read(PENDING_SPECIFICATION),
+            'next': orders[-1:].id if len(orders) == limit else None,
+        }, headers=headers)
+
+    @http.route('/sale_approval/api/approve', type='json', auth='user',
+                methods=['POST'])
+    def approve(self, order_ids, reason=None):
+        """Approve the given orders, see ``_process``"""
+        return self._process(order_ids, '_action_approve', reason)
+
+    @http.route('/sale_approval/api/reject', type='json', auth='user',
+                methods=['POST'])
+    def reject(self, order_ids, reason=None):
+        """Reject the given orders, see ``_process``"""
+        return self._process(order_ids, '_action_reject', reason)
+
+    def _process(self, order_ids, method, reason=None):
+        """Approve or reject the orders of ``order_ids`` the user may act on
+        in one batch, through the methods behind ``button_approve`` and
+        ``action_cancel``.
+
+        :return: the order ids by outcome: ``done`` (approved or rejected),
+            ``pending`` (stage of an approval chain signed off, the order
+            still waiting for its next stage), ``handled`` (already moved
+            by another user), ``denied`` (not the user's to approve) and
+            ``not_found`` (missing or not readable)
+        """
+        orders = request.env['sale.order'].search([('id', 'in', order_ids)])
+        waiting = orders.filtered(lambda order: order.state == 'to_approve')
+        denied = waiting.filtered(lambda order: not order.can_approve)
+        handled = getattr(waiting - denied, method)(reason) | (orders - waiting)
+        processed = orders - denied - handled
+        pending = processed.filtered(lambda order: order.state == 'to_approve')
+        return {
+            'done': (processed - pending).ids,
+            'pending': pending.ids,
+            'handled': handled.ids,
+            'denied': denied.ids,
+            'not_found': sorted(set(order_ids) - set(orders.ids)),
+        }
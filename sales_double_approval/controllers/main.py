@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    OpenERP, Open Source Management Solution
+#    Copyright (C) Wan Buffer Solution (<https://wanbuffer.com/>).
+#
+#    For Module Support : info@wanbuffer.com or Call : +91 9638442270
+#
+##############################################################################
+
+import hmac
+import os
+
+from odoo import http
+from odoo.http import request
+from odoo.tools import config
+
+from ..models.approval_metrics import METRICS
+
+
+def get_metrics_token():
+    """Bearer token the metrics scrapers must present, from the
+    ``SALE_APPROVAL_METRICS_TOKEN`` environment variable or the
+    ``sale_approval_metrics_token`` server option; without one the endpoint
+    is disabled"""
+    return os.environ.get('SALE_APPROVAL_METRICS_TOKEN') \
+        or config.get('sale_approval_metrics_token') or ''
+
+
+class SaleApprovalMetrics(http.Controller):
+    """Prometheus endpoint of the approval instrumentation"""
+
+    @http.route('/sale_approval/metrics', type='http', auth='none',
+                methods=['GET'], csrf=False, save_session=False)
+    def metrics(self):
+        """Counters of the server process answering the request; scrape
+        every worker (or run a single one) for the complete figures. The
+        peer address proves nothing behind a reverse proxy: the scraper
+        authenticates with the configured bearer token."""
+        token = get_metrics_token()
+        authorization = request.httprequest.headers.get('Authorization', '')
+        if not METRICS.enabled or not token or not hmac.compare_digest(
+                authorization.encode(), f'Bearer {token}'.encode()):
+            return request.not_found()
+        return request.make_response(
+            METRICS.to_prometheus(),
+            headers=[('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')])
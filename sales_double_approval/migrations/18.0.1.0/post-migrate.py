@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    OpenERP, Open Source Management Solution
+#    Copyright (C) Wan Buffer Solution (<https://wanbuffer.com/>).
+#
+#    For Module Support : info@wanbuffer.com or Call : +91 9638442270
+#
+##############################################################################
+
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    """Bulk-evaluate the approval fields of every existing order"""
+    if not version:
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    env['sale.order']._recompute_approval_fields(states=None)
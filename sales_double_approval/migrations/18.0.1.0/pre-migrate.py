@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    OpenERP, Open Source Management Solution
+#    Copyright (C) Wan Buffer Solution (<https://wanbuffer.com/>).
+#
+#    For Module Support : info@wanbuffer.com or Call : +91 9638442270
+#
+##############################################################################
+
+
+def migrate(cr, version):
+    """Create the columns of the now stored approval fields up front, so the
+    ORM does not recompute every order one batch at a time on upgrade; the
+    post-migration fills them with a single UPDATE."""
+    if not version:
+        return
+    cr.execute("""
+        ALTER TABLE sale_order
+            ADD COLUMN IF NOT EXISTS approval_required boolean,
+            ADD COLUMN IF NOT EXISTS approval_level varchar
+    """)
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    OpenERP, Open Source Management Solution
+#    Copyright (C) Wan Buffer Solution (<https://wanbuffer.com/>).
+#
+#    For Module Support : info@wanbuffer.com or Call : +91 9638442270
+#
+##############################################################################
+
+from odoo import api, SUPERUSER_ID
+
+from odoo.addons.sales_double_approval.models.approval_matrix import \
+    APPROVAL_RANGE_PARAMS
+
+
+def migrate(cr, version):
+    """Turn the three global approval ranges into approval rules of every
+    company, with the same defaults the ranges used to fall back on."""
+    if not version:
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    get_param = env['ir.config_parameter'].get_param
+    rows = []
+    for row, min_key, max_key, approver_key, min_default, max_default, name \
+            in APPROVAL_RANGE_PARAMS:
+        min_amount = float(get_param(min_key, default=min_default))
+        max_amount = float(get_param(max_key, default=max_default)) \
+            if max_key else 0.0
+        try:
+            approver_id = int(get_param(approver_key) or 0)
+        except (ValueError, TypeError):
+            approver_id = 0
+        rows.append((row, name, min_amount, max_amount, approver_id))
+    rules = env['sale.approval.rule'].with_context(approval_rules_batch=True)
+    for company in env['res.company'].search([]):
+        rules._sync_settings_rows(company, rows)
+    env.registry.clear_cache()
+    env['sale.order']._recompute_approval_fields(states=None)
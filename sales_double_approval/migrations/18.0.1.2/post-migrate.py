@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    OpenERP, Open Source Management Solution
+#    Copyright (C) Wan Buffer Solution (<https://wanbuffer.com/>).
+#
+#    For Module Support : info@wanbuffer.com or Call : +91 9638442270
+#
+##############################################################################
+
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    """Fill the approval amount: a plain copy for the orders in company
+    currency, a batch conversion for the others, then re-evaluate the
+    approval fields of every order."""
+    if not version:
+        return
+    cr.execute("""
+        UPDATE sale_order so
+           SET approval_amount = so.amount_total
+          FROM res_company c
+         WHERE c.id = so.company_id
+           AND c.currency_id = so.currency_id
+    """)
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    SaleOrder = env['sale.order']
+    cr.execute("SELECT id FROM sale_order WHERE approval_amount IS NULL")
+    foreign_orders = SaleOrder.browse([row[0] for row in cr.fetchall()])
+    if foreign_orders:
+        env.add_to_compute(SaleOrder._fields['approval_amount'], foreign_orders)
+        foreign_orders.flush_recordset(['approval_amount'])
+    SaleOrder._recompute_approval_fields(states=None)
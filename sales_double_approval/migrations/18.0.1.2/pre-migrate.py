@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    OpenERP, Open Source Management Solution
+#    Copyright (C) Wan Buffer Solution (<https://wanbuffer.com/>).
+#
+#    For Module Support : info@wanbuffer.com or Call : +91 9638442270
+#
+##############################################################################
+
+
+def migrate(cr, version):
+    """Create the approval amount column up front; the post-migration fills
+    it in bulk instead of letting the ORM recompute every order."""
+    if not version:
+        return
+    cr.execute("""
+        ALTER TABLE sale_order
+            ADD COLUMN IF NOT EXISTS approval_amount numeric
+    """)
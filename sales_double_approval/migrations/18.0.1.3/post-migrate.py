@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    OpenERP, Open Source Management Solution
+#    Copyright (C) Wan Buffer Solution (<https://wanbuffer.com/>).
+#
+#    For Module Support : info@wanbuffer.com or Call : +91 9638442270
+#
+##############################################################################
+
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    """The company flag now gates the approval: enable it on the companies
+    which have approval rules, so they keep requiring approvals."""
+    if not version:
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    companies = env['sale.approval.rule'].search([]).company_id
+    companies.filtered(lambda company: not company.so_double_validation).write(
+        {'so_double_validation': True})
+    env['ir.config_parameter'].search(
+        [('key', '=', 'sales_double_approval.so_approval')]).unlink()
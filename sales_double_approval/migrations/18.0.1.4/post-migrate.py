@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    OpenERP, Open Source Management Solution
+#    Copyright (C) Wan Buffer Solution (<https://wanbuffer.com/>).
+#
+#    For Module Support : info@wanbuffer.com or Call : +91 9638442270
+#
+##############################################################################
+
+
+def migrate(cr, version):
+    """Date the orders already waiting for approval from their last logged
+    submission, or their last update, so the dashboard can age them."""
+    if not version:
+        return
+    cr.execute("""
+        UPDATE sale_order so
+           SET approval_request_date = COALESCE(
+                   (SELECT MAX(log.date)
+                      FROM sale_approval_log log
+                     WHERE log.order_id = so.id
+                       AND log.action = 'submitted'),
+                   so.write_date)
+         WHERE so.state = 'to_approve'
+           AND so.approval_request_date IS NULL
+    """)
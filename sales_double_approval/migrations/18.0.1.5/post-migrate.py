@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    OpenERP, Open Source Management Solution
+#    Copyright (C) Wan Buffer Solution (<https://wanbuffer.com/>).
+#
+#    For Module Support : info@wanbuffer.com or Call : +91 9638442270
+#
+##############################################################################
+
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    """The approval request template now only holds the per-order part of
+    the e-mail, its styled shell being a separate layout: reload the
+    template from the module data, it is not updated otherwise."""
+    if not version:
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    template = env.ref(
+        'sales_double_approval.email_template_quotation_approval_request',
+        raise_if_not_found=False)
+    if template:
+        template.reset_template()
@@ -7,6 +7,15 @@
 #    For Module Support : info@wanbuffer.com  or Call : +91 9638442270
 #
 ##############################################################################
+from . import mail_activity
 from . import res_company
 from . import res_config_settings
+from . import res_currency
+from . import sale_approval_dashboard
+from . import sale_approval_delegation
+from . import sale_approval_log
+from . import sale_approval_rule
+from . import sale_approval_summary
 from . import sale_order
+from . import sale_order_approval_stage
+from . import sale_order_line
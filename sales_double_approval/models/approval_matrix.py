@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    OpenERP, Open Source Management Solution
+#    Copyright (C) Wan Buffer Solution (<https://wanbuffer.com/>).
+#
+#    For Module Support : info@wanbuffer.com or Call : +91 9638442270
+#
+##############################################################################
+
+from bisect import bisect_right
+from collections import namedtuple
+
+# Legacy settings rows: (row, ir.config_parameter key of the minimum, key of
+# the maximum, key of the approver, default minimum, default maximum, name)
+APPROVAL_RANGE_PARAMS = (
+    (1, 'sales_double_approval.so_min_amount', 'sales_double_approval.so_max_amount',
+     'sales_double_approval.approval', 0.0, 1000.0, 'Range 1'),
+    (2, 'sales_double_approval.so_min_amount2', 'sales_double_approval.so_max_amount2',
+     'sales_double_approval.approval2', 1001.0, 5000.0, 'Range 2'),
+    (3, 'sales_double_approval.so_min_amount3', None,
+     'sales_double_approval.approval3', 5001.0, None, 'Range 3'),
+)
+
+
+class ApprovalStage(namedtuple('ApprovalStage', [
+        'stage_id', 'name', 'sequence', 'approver_ids', 'required_count'])):
+    """One compiled stage of an approval chain: ``required_count`` users of
+    ``approver_ids`` (a tuple of user ids) must sign it off."""
+    __slots__ = ()
+
+
+class ApprovalTier(namedtuple('ApprovalTier', [
+        'rule_id', 'name', 'currency_id', 'min_amount', 'max_amount',
+        'approver_id', 'level', 'stages'], defaults=((),))):
+    """One compiled approval rule. ``max_amount`` is None for an open-ended
+    tier, ``approver_id`` is a plain user id (or False). ``stages`` is the
+    tuple of :class:`ApprovalStage` of a chained rule, empty otherwise."""
+    __slots__ = ()
+
+    def contains(self, amount):
+        if self.max_amount is None:
+            return amount >= self.min_amount
+        return self.min_amount <= amount <= self.max_amount
+
+    @staticmethod
+    def format_level(name, min_amount, max_amount):
+        if max_amount is None:
+            return f"{name} (>= {min_amount})"
+        return f"{name} ({min_amount} - {max_amount})"
+
+
+class ApprovalCondition(namedtuple('ApprovalCondition', [
+        'tier', 'model', 'domain'])):
+    """Compiled condition rule: an order fires the rule when it matches
+    ``domain`` (model ``sale.order``) or when one of its lines does (model
+    ``sale.order.line``). ``tier`` holds the rule approver and label."""
+    __slots__ = ()
+
+    def matching_ids(self, orders):
+        """Ids of ``orders`` firing the rule, with a single query for the
+        stored orders whatever their number"""
+        stored = orders.filtered(lambda order: isinstance(order.id, int))
+        new = orders - stored
+        domain = list(self.domain)
+        ids = set()
+        if self.model == 'sale.order':
+            if stored:
+                ids.update(stored.sudo().search(
+                    [('id', 'in', stored.ids)] + domain).ids)
+            ids.update(new.filtered_domain(domain).ids)
+        else:
+            if stored:
+                ids.update(order.id for [order] in orders.env[self.model].sudo()._read_group(
+                    [('order_id', 'in', stored.ids)] + domain, ['order_id']))
+            ids.update(new.filtered(
+                lambda order: order.order_line.filtered_domain(domain)).ids)
+        return ids
+
+    def order_domain(self):
+        """Domain on sale.order equivalent to the condition"""
+        if self.model == 'sale.order':
+            return list(self.domain)
+        return [('order_line', 'any', list(self.domain))]
+
+
+class ApprovalMatrix:
+    """Immutable, pre-compiled approval rules of one company.
+
+    Tiers are split per currency and sorted on their lower bound, so a tier
+    is found by bisecting the array of lower bounds. Orders in a currency
+    without tiers of its own are evaluated on the company currency tiers,
+    with their amount converted in the company currency.
+
+    Condition rules (see :class:`ApprovalCondition`) are kept aside, in
+    sequence, their domains being parsed once when the matrix is compiled.
+
+    Only plain python values are kept (no records), so an instance can be
+    safely shared between environments through ``ormcache``.
+    """
+    __slots__ = ('currency_id', 'tiers', 'conditions', '_tables')
+
+    def __init__(self, currency_id, tiers, conditions=()):
+        self.currency_id = currency_id
+        self.conditions = tuple(conditions)
+        self.tiers = tuple(sorted(
+            tiers, key=lambda tier: (tier.currency_id, tier.min_amount)))
+        tables = {}
+        for tier in self.tiers:
+            tables.setdefault(tier.currency_id, []).append(tier)
+        self._tables = {
+            currency: (tuple(tier.min_amount for tier in currency_tiers),
+                       tuple(currency_tiers))
+            for currency, currency_tiers in tables.items()
+        }
+
+    def __bool__(self):
+        return bool(self.tiers or self.conditions)
+
+    @property
+    def all_tiers(self):
+        """Amount tiers and condition tiers"""
+        return self.tiers + tuple(condition.tier for condition in self.conditions)
+
+    @property
+    def currency_ids(self):
+        """Currencies having tiers of their own"""
+        return frozenset(self._tables)
+
+    def match(self, amount, currency_id=None):
+        """Return the :class:`ApprovalTier` containing ``amount`` (expressed
+        in ``currency_id``, the company currency by default) or None"""
+        table = self._tables.get(currency_id or self.currency_id)
+        if not table:
+            return None
+        lower_bounds, tiers = table
+        index = bisect_right(lower_bounds, amount) - 1
+        if index >= 0 and tiers[index].contains(amount):
+            return tiers[index]
+        return None
+
+    def escalation_tiers(self, tier):
+        """Tiers above ``tier`` in its currency, in ascending order; condition
+        tiers have none"""
+        table = self._tables.get(tier.currency_id)
+        if not table or tier not in table[1]:
+            return ()
+        tiers = table[1]
+        return tiers[tiers.index(tier) + 1:]
+
+    def changed_bands(self, other):
+        """Amount bands where ``other`` (typically the matrix before a change)
+        and self may match an order on different tiers, by currency: merged
+        ``(min, max)`` intervals, ``max`` being None when open-ended.
+
+        Outside the intervals of the tiers found in only one of the matrices,
+        both match the same tier or none. A currency gaining or losing tiers
+        of its own moves its orders between its tiers and the company ones:
+        it is mapped to None, meaning every amount.
+        """
+        intervals = {}
+        for tier in set(self.tiers) ^ set(other.tiers):
+            intervals.setdefault(tier.currency_id, []).append(
+                (tier.min_amount, tier.max_amount))
+        bands = {}
+        for currency_id, currency_intervals in intervals.items():
+            merged = []
+            for min_amount, max_amount in sorted(currency_intervals, key=lambda band: band[0]):
+                if merged and (merged[-1][1] is None or min_amount <= merged[-1][1]):
+                    last_min, last_max = merged[-1]
+                    merged[-1] = (last_min, None if None in (last_max, max_amount)
+                                  else max(last_max, max_amount))
+                else:
+                    merged.append((min_amount, max_amount))
+            bands[currency_id] = merged
+        for currency_id in (self.currency_ids ^ other.currency_ids) - {self.currency_id}:
+            bands[currency_id] = None
+        return bands
+
+    def match_amounts(self, amount, currency_id, company_amount):
+        """Match an order on the tiers of its own currency when there are
+        some, else on its amount converted in the company currency"""
+        if currency_id != self.currency_id and currency_id in self._tables:
+            return self.match(amount, currency_id)
+        return self.match(company_amount, self.currency_id)
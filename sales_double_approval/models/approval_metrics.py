@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    OpenERP, Open Source Management Solution
+#    Copyright (C) Wan Buffer Solution (<https://wanbuffer.com/>).
+#
+#    For Module Support : info@wanbuffer.com or Call : +91 9638442270
+#
+##############################################################################
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+from odoo.tools import config, str2bool
+
+_logger = logging.getLogger(__name__)
+
+
+class ApprovalMetrics:
+    """Counters of the instrumented approval methods, per method: calls,
+    wall time, SQL queries and records processed. They are kept in memory,
+    per server process, and include the nested instrumented calls.
+
+    Disabled unless the ``sale_approval_metrics`` option of the server
+    configuration file or the ``SALE_APPROVAL_METRICS`` environment variable
+    is set: an instrumented method then costs a single attribute check.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, name, seconds, queries, records):
+        with self._lock:
+            stats = self._stats.setdefault(name, [0, 0.0, 0, 0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] += queries
+            stats[3] += records
+
+    def snapshot(self):
+        """``{method: (calls, seconds, queries, records)}``"""
+        with self._lock:
+            return {name: tuple(stats) for name, stats in self._stats.items()}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def to_prometheus(self):
+        """The counters in the Prometheus text exposition format"""
+        snapshot = sorted(self.snapshot().items())
+        lines = []
+        for index, (metric, help_text) in enumerate((
+                ('sale_approval_calls_total', "Calls of the approval method"),
+                ('sale_approval_seconds_total', "Wall time spent in the approval method"),
+                ('sale_approval_queries_total', "SQL queries run by the approval method"),
+                ('sale_approval_records_total', "Records processed by the approval method"),
+        )):
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            lines += [
+                f'{metric}{{method="{name}"}} {stats[index]}'
+                for name, stats in snapshot
+            ]
+        return "\n".join(lines) + "\n"
+
+
+METRICS = ApprovalMetrics(enabled=str2bool(
+    os.environ.get('SALE_APPROVAL_METRICS') or config.get('sale_approval_metrics') or '0',
+    False))
+
+
+def instrumented(method):
+    """Record the calls of a model method in :data:`METRICS`, and log every
+    call as a JSON line at debug level. Place it under the ``api``
+    decorators."""
+    name = method.__qualname__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not METRICS.enabled:
+            return method(self, *args, **kwargs)
+        cr = self.env.cr
+        queries = cr.sql_log_count
+        started = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - started
+            query_count = cr.sql_log_count - queries
+            METRICS.record(name, seconds, query_count, len(self))
+            if _logger.isEnabledFor(logging.DEBUG):
+                _logger.debug(json.dumps({
+                    'method': name,
+                    'seconds': round(seconds, 6),
+                    'queries': query_count,
+                    'records': len(self),
+                    'uid': self.env.uid,
+                }))
+    return wrapper
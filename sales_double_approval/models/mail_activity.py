@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    OpenERP, Open Source Management Solution
+#    Copyright (C) Wan Buffer Solution (<https://wanbuffer.com/>).
+#
+#    For Module Support : info@wanbuffer.com or Call : +91 9638442270
+#
+##############################################################################
+
+from odoo import fields, models, tools
+
+
+class MailActivity(models.Model):
+    """Inheriting mail.activity to key the approval activities"""
+    _inherit = 'mail.activity'
+
+    sale_approval_rule_id = fields.Many2one(
+        'sale.approval.rule',
+        string="Approval Rule",
+        ondelete='set null',
+        help="Approval tier this sale order approval activity was created for")
+
+    def init(self):
+        """Exact de-duplication key of the approval activities"""
+        super().init()
+        tools.create_index(
+            self._cr, 'mail_activity_sale_approval_key_index', self._table,
+            ['res_model', 'res_id', 'user_id', 'activity_type_id',
+             'sale_approval_rule_id'],
+            where="sale_approval_rule_id IS NOT NULL")
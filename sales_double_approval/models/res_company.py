@@ -19,3 +19,12 @@ class ResCompany(models.Model):
         help="Enable this option to require double validation for sale orders. "
              "When enabled, sale orders exceeding a specified minimum amount "
              "will require approval by a sales manager.")
+
+    def write(self, vals):
+        rules = self.env['sale.approval.rule']
+        old_matrices = rules._get_current_matrices(self.ids) \
+            if 'so_double_validation' in vals else None
+        res = super().write(vals)
+        if 'so_double_validation' in vals:
+            rules._approval_rules_changed(self.ids, old_matrices)
+        return res
@@ -9,14 +9,24 @@
 ##############################################################################
 
 from odoo import api, fields, models
-from odoo.exceptions import ValidationError
+from odoo.tools import SQL, str2bool
+
+from .approval_metrics import instrumented
+
+# Approval settings kept in system parameters, by settings field
+APPROVAL_PARAMS = {
+    'approval_mail_sync': 'sales_double_approval.approval_mail_sync',
+    'approval_mail_digest': 'sales_double_approval.approval_mail_digest',
+    'approval_dashboard_summary': 'sales_double_approval.dashboard_summary',
+}
 
-from ast import literal_eval
 
 class ResConfigSettings(models.TransientModel):
     """ Inheriting the settings to add custom fields """
     _inherit = 'res.config.settings'
 
+    # not a related field: it is saved along with the rest of the approval
+    # settings in set_values, under a single cache invalidation
     so_approval = fields.Boolean(
         string="Sale Order Approval",
         help="Enable this option to require double validation for sale orders."
@@ -76,6 +86,21 @@ class ResConfigSettings(models.TransientModel):
         help="Select the user who will be responsible for approving sale orders",
         domain="[('share', '=', False)]"
     )
+    approval_mail_sync = fields.Boolean(
+        string="Send Approval E-mails Immediately",
+        help="Send the approval request e-mails within the user request "
+             "instead of queueing them for the mail scheduler."
+    )
+    approval_mail_digest = fields.Boolean(
+        string="Approval Digest",
+        help="Instead of one e-mail per quotation, send every approver a "
+             "periodic digest of the quotations waiting for their approval."
+    )
+    approval_dashboard_summary = fields.Boolean(
+        string="Approval Summary",
+        help="Maintain a daily summary of the approval log, so the approval "
+             "dashboard does not aggregate the whole log when it is opened."
+    )
     map_box_token = fields.Char(
         string="Mapbox Token",
         help="Enter your Mapbox API token here."
@@ -85,109 +110,138 @@ class ResConfigSettings(models.TransientModel):
                     'so_max_amount2', 'so_min_amount3' )
     def _check_amount_ranges(self):
         """Validate that ranges don't overlap and are logical"""
+        rules = self.env['sale.approval.rule']
         for record in self:
-            if record.so_min_amount >= record.so_max_amount:
-                raise ValidationError("Range 1: Minimum amount must be less than maximum amount")
+            rules._check_sorted_intervals(
+                (name, min_amount, max_amount or None)
+                for __, name, min_amount, max_amount, __
+                in record._get_approval_rows()
+                if min_amount or max_amount)
 
-            if record.so_min_amount2 and record.so_min_amount2 <= record.so_max_amount:
-                raise ValidationError("Range 2: Minimum amount must be greater than Range 1 maximum")
+    def _get_approval_rows(self):
+        """Rows of the approval settings table, as expected by
+        ``sale.approval.rule._sync_settings_rows``"""
+        self.ensure_one()
+        return [
+            (1, 'Range 1', self.so_min_amount, self.so_max_amount, self.approval.id),
+            (2, 'Range 2', self.so_min_amount2, self.so_max_amount2, self.approval2.id),
+            (3, 'Range 3', self.so_min_amount3, 0.0, self.approval3.id),
+        ]
+
+    @api.model
+    def _get_approval_params(self):
+        """Values of the approval system parameters, read with one query"""
+        return {
+            param.key: param.value
+            for param in self.env['ir.config_parameter'].sudo().search_fetch(
+                [('key', 'in', list(APPROVAL_PARAMS.values()))], ['key', 'value'])
+        }
+
+    @api.model
+    def _set_approval_params(self, values):
+        """Upsert the changed approval system parameters with one statement,
+        without the cache invalidation ``set_param`` does for every key; the
+        caller invalidates once for the whole save.
 
-            if record.so_max_amount2 and record.so_min_amount2 >= record.so_max_amount2:
-                raise ValidationError("Range 2: Minimum amount must be less than maximum amount")
+        :param values: ``{key: value}``
+        :return: whether any parameter changed
+        """
+        current = self._get_approval_params()
+        changed = {
+            key: str(value) for key, value in values.items()
+            if current.get(key, 'False') != str(value)
+        }
+        if not changed:
+            return False
+        self.env['ir.config_parameter'].flush_model()
+        self.env.cr.execute(SQL("""
+            INSERT INTO ir_config_parameter
+                   (key, value, create_uid, create_date, write_uid, write_date)
+            VALUES %s
+            ON CONFLICT (key) DO UPDATE
+               SET value = EXCLUDED.value,
+                   write_uid = EXCLUDED.write_uid,
+                   write_date = EXCLUDED.write_date
+        """, SQL(", ").join(
+            SQL("(%s, %s, %s, NOW() AT TIME ZONE 'UTC', %s, NOW() AT TIME ZONE 'UTC')",
+                key, value, self.env.uid, self.env.uid)
+            for key, value in changed.items()
+        )))
+        self.env['ir.config_parameter'].invalidate_model(['value'])
+        return True
 
-            if record.so_min_amount3 and record.so_min_amount3 <= record.so_max_amount2:
-                raise ValidationError("Range 3: Minimum amount must be greater than Range 2 maximum")
- 
     @api.model
+    @instrumented
     def get_values(self):
         """ Override to get the values of the custom fields from the
-        'ir.config_parameter' model. """
+        'ir.config_parameter' model and from the approval rules of the
+        current company, with one query each. """
         res = super(ResConfigSettings, self).get_values()
-        icp_sudo = self.env['ir.config_parameter'].sudo()
-        
-        # Get Boolean and Float/Monetary values
+
+        # Get Boolean values
+        params = self._get_approval_params()
+        res.update({
+            field: str2bool(params.get(key) or 'False')
+            for field, key in APPROVAL_PARAMS.items()
+        })
+        res['so_approval'] = self.env.company.so_double_validation
+
+        # Get the rows of the table from the company rules
+        rules = self.env['sale.approval.rule'].sudo()
+        rows = {
+            rule.settings_row: rule
+            for rule in rules.search([
+                ('company_id', '=', self.env.company.id),
+                ('settings_row', 'in', (1, 2, 3)),
+            ])
+        }
+        row1, row2, row3 = (rows.get(row, rules) for row in (1, 2, 3))
         res.update({
-            'so_approval': icp_sudo.get_param(
-                "sales_double_approval.so_approval", default=False),
-            
             # Row 1 Values
-            'so_min_amount': float(icp_sudo.get_param(
-                "sales_double_approval.so_min_amount", default=0.0)),
-            'so_max_amount': float(icp_sudo.get_param(
-                "sales_double_approval.so_max_amount", default=0.0)),
-            
+            'so_min_amount': row1.min_amount,
+            'so_max_amount': row1.max_amount,
+            'approval': row1.approver_id.id,
+
             # Row 2 Values
-            'so_min_amount2': float(icp_sudo.get_param(
-                "sales_double_approval.so_min_amount2", default=0.0)),
-            'so_max_amount2': float(icp_sudo.get_param(
-                "sales_double_approval.so_max_amount2", default=0.0)),
-            
+            'so_min_amount2': row2.min_amount,
+            'so_max_amount2': row2.max_amount,
+            'approval2': row2.approver_id.id,
+
             # Row 3 Values
-            'so_min_amount3': float(icp_sudo.get_param(
-                "sales_double_approval.so_min_amount3", default=0.0)),
+            'so_min_amount3': row3.min_amount,
+            'approval3': row3.approver_id.id,
         })
-        
-        # Get Many2one values (User IDs)
-        approval_id = icp_sudo.get_param(
-            "sales_double_approval.approval", default=False)
-        if approval_id:
-            res['approval'] = int(approval_id)
-        
-        approval2_id = icp_sudo.get_param(
-            "sales_double_approval.approval2", default=False)
-        if approval2_id:
-            res['approval2'] = int(approval2_id)
-            
-        approval3_id = icp_sudo.get_param(
-            "sales_double_approval.approval3", default=False)
-        if approval3_id:
-            res['approval3'] = int(approval3_id)
-        
         return res
 
     @api.model
+    @instrumented
     def set_values(self):
         """ Override to set the values of the custom fields in the
-        'ir.config_parameter' model. """
+        'ir.config_parameter' model and in the approval rules of the
+        current company.
+
+        The company flag, the parameters and the rules are saved in batch
+        mode and compared with what they were: the caches are invalidated
+        (on every worker) once, and only when something changed. """
         super(ResConfigSettings, self).set_values()
-        icp_sudo = self.env['ir.config_parameter'].sudo()
-        
-        # Set Boolean and Float/Monetary values
-        icp_sudo.set_param( 
-            "sales_double_approval.so_approval",
-            self.so_approval)
-        
-        # Row 1 Values
-        icp_sudo.set_param(
-            "sales_double_approval.so_min_amount",
-            self.so_min_amount or 0.0)
-        icp_sudo.set_param(
-            "sales_double_approval.so_max_amount",
-            self.so_max_amount or 0.0)
-        
-        # Row 2 Values   
-        icp_sudo.set_param(
-            "sales_double_approval.so_min_amount2",
-            self.so_min_amount2 or 0.0)
-        icp_sudo.set_param(
-            "sales_double_approval.so_max_amount2",
-            self.so_max_amount2 or 0.0)
-        
-        # Row 3 Values
-        icp_sudo.set_param(
-            "sales_double_approval.so_min_amount3",
-            self.so_min_amount3 or 0.0)
-    
-        
-        # Set Many2one values (User IDs)
-        icp_sudo.set_param(
-            "sales_double_approval.approval",
-            self.approval.id if self.approval else False)
-        icp_sudo.set_param(
-            "sales_double_approval.approval2",
-            self.approval2.id if self.approval2 else False)
-        icp_sudo.set_param(
-            "sales_double_approval.approval3",
-            self.approval3.id if self.approval3 else False)
+        company = self.env.company
+        rules = self.env['sale.approval.rule'].sudo()
+        old_matrices = rules._get_current_matrices(company.ids)
+        batch_rules = rules.with_context(approval_rules_batch=True)
 
+        if company.so_double_validation != self.so_approval:
+            company.sudo().with_context(approval_rules_batch=True).write(
+                {'so_double_validation': self.so_approval})
+        params_changed = self._set_approval_params({
+            key: self[field] for field, key in APPROVAL_PARAMS.items()
+        })
 
+        # Mirror the table into the approval rules of the current company
+        batch_rules._sync_settings_rows(company, self._get_approval_rows())
+        matrix = batch_rules._compile_matrix(company.id)
+        old_matrix = old_matrices[company.id]
+        if (matrix.tiers, matrix.conditions) != (old_matrix.tiers, old_matrix.conditions):
+            # drops the compiled matrices and re-evaluates the orders
+            rules._approval_rules_changed(company.ids, old_matrices)
+        elif params_changed:
+            self.env.registry.clear_cache()
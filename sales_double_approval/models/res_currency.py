@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    OpenERP, Open Source Management Solution
+#    Copyright (C) Wan Buffer Solution (<https://wanbuffer.com/>).
+#
+#    For Module Support : info@wanbuffer.com or Call : +91 9638442270
+#
+##############################################################################
+
+from odoo import models
+from odoo.tools import SQL
+
+
+class ResCurrency(models.Model):
+    """Inheriting res.currency to fetch rate tables in bulk"""
+    _inherit = 'res.currency'
+
+    def _get_rates_by_day(self, company, days):
+        """Rates of the currencies of self for every day of ``days``, fetched
+        with a single query. Same semantic as ``_get_rates``: latest rate of
+        the day or before, else the oldest known rate, else 1.
+
+        :return: dict ``{(currency_id, day): rate}``
+        """
+        if not self or not days:
+            return {}
+        self.env['res.currency.rate'].flush_model(
+            ['rate', 'name', 'currency_id', 'company_id'])
+        self.env.cr.execute(SQL("""
+            SELECT c.id, d.day, COALESCE(
+                       (SELECT r.rate FROM res_currency_rate r
+                         WHERE r.currency_id = c.id AND r.name <= d.day
+                           AND (r.company_id IS NULL OR r.company_id = %(company_id)s)
+                      ORDER BY r.company_id, r.name DESC
+                         LIMIT 1),
+                       (SELECT r.rate FROM res_currency_rate r
+                         WHERE r.currency_id = c.id
+                           AND (r.company_id IS NULL OR r.company_id = %(company_id)s)
+                      ORDER BY r.company_id, r.name ASC
+                         LIMIT 1),
+                       1.0)
+              FROM res_currency c, unnest(%(days)s::date[]) AS d(day)
+             WHERE c.id IN %(currency_ids)s
+        """, company_id=company.root_id.id, days=sorted(days),
+            currency_ids=tuple(self.ids)))
+        return {
+            (currency_id, day): rate
+            for currency_id, day, rate in self.env.cr.fetchall()
+        }
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    OpenERP, Open Source Management Solution
+#    Copyright (C) Wan Buffer Solution (<https://wanbuffer.com/>).
+#
+#    For Module Support : info@wanbuffer.com or Call : +91 9638442270
+#
+##############################################################################
+
+from datetime import timedelta
+
+from odoo import api, fields, models, _
+
+# Days of approval history the throughput figures cover
+THROUGHPUT_DAYS = 30
+
+
+class SaleApprovalDashboard(models.TransientModel):
+    """Approval SLA figures of a company. Every figure comes from a grouped
+    query on the stored approval fields, the approval log or its summary,
+    so opening the dashboard never loads the orders themselves."""
+    _name = 'sale.approval.dashboard'
+    _description = "Sale Order Approval Dashboard"
+
+    company_id = fields.Many2one(
+        'res.company', string="Company", required=True,
+        default=lambda self: self.env.company)
+    currency_id = fields.Many2one(related='company_id.currency_id')
+    queue_count = fields.Integer(string="Waiting", compute='_compute_queue')
+    queue_amount = fields.Monetary(string="Waiting Amount", compute='_compute_queue')
+    oldest_hours = fields.Float(string="Oldest Request (Hours)", compute='_compute_queue')
+    age_day_count = fields.Integer(string="Less than 1 Day", compute='_compute_queue')
+    age_week_count = fields.Integer(string="1 to 7 Days", compute='_compute_queue')
+    age_month_count = fields.Integer(string="7 to 30 Days", compute='_compute_queue')
+    age_older_count = fields.Integer(string="Over 30 Days", compute='_compute_queue')
+    submitted_count = fields.Integer(string="Submitted", compute='_compute_throughput')
+    approved_count = fields.Integer(string="Approved", compute='_compute_throughput')
+    rejected_count = fields.Integer(string="Rejected", compute='_compute_throughput')
+    avg_wait_hours = fields.Float(
+        string="Average Waiting Time (Hours)", compute='_compute_throughput')
+
+    @api.depends('company_id')
+    def _compute_queue(self):
+        now = fields.Datetime.now()
+        for dashboard in self:
+            domain = dashboard._get_queue_domain()
+            [(count, amount, oldest)] = self.env['sale.order']._read_group(
+                domain, [], ['__count', 'approval_amount:sum', 'approval_request_date:min'])
+            ages = dict.fromkeys(('day', 'week', 'month', 'older'), 0)
+            for day, day_count in self.env['sale.order']._read_group(
+                    domain, ['approval_request_date:day'], ['__count']):
+                # the day groups of a datetime field are datetimes
+                age = (now.date() - fields.Date.to_date(day)).days if day else 0
+                bucket = 'day' if age < 1 else 'week' if age < 7 \
+                    else 'month' if age < 30 else 'older'
+                ages[bucket] += day_count
+            dashboard.update({
+                'queue_count': count,
+                'queue_amount': amount,
+                'oldest_hours': (now - oldest).total_seconds() / 3600 if oldest else 0.0,
+                'age_day_count': ages['day'],
+                'age_week_count': ages['week'],
+                'age_month_count': ages['month'],
+                'age_older_count': ages['older'],
+            })
+
+    @api.depends('company_id')
+    def _compute_throughput(self):
+        since = fields.Datetime.now() - timedelta(days=THROUGHPUT_DAYS)
+        summary = self.env['sale.approval.summary']
+        use_summary = summary._is_enabled()
+        for dashboard in self:
+            if use_summary:
+                [(submitted, approved, rejected, wait)] = summary._read_group(
+                    [('company_id', '=', dashboard.company_id.id),
+                     ('date', '>=', since.date())],
+                    [], ['submitted_count:sum', 'approved_count:sum',
+                         'rejected_count:sum', 'wait_hours:sum'])
+            else:
+                counts = dict.fromkeys(('submitted', 'approved', 'rejected'), 0)
+                wait = 0.0
+                for action, count, action_wait in self.env['sale.approval.log']._read_group(
+                        [('company_id', '=', dashboard.company_id.id),
+                         ('date', '>=', since)],
+                        ['action'], ['__count', 'wait_hours:sum']):
+                    if action in counts:
+                        counts[action] = count
+                    if action in ('approved', 'rejected'):
+                        wait += action_wait
+                submitted, approved, rejected = (
+                    counts['submitted'], counts['approved'], counts['rejected'])
+            decided = (approved or 0) + (rejected or 0)
+            dashboard.update({
+                'submitted_count': submitted or 0,
+                'approved_count': approved or 0,
+                'rejected_count': rejected or 0,
+                'avg_wait_hours': (wait or 0.0) / decided if decided else 0.0,
+            })
+
+    def _get_queue_domain(self):
+        self.ensure_one()
+        return [('state', '=', 'to_approve'), ('company_id', '=', self.company_id.id)]
+
+    def action_open_queue(self):
+        """Approval queue analysis, grouped by approval level"""
+        self.ensure_one()
+        action = self.env['ir.actions.act_window']._for_xml_id(
+            'sales_double_approval.action_sale_approval_queue_analysis')
+        action['domain'] = self._get_queue_domain()
+        return action
+
+    def action_open_throughput(self):
+        """Throughput per approver, from the summary when it is maintained"""
+        self.ensure_one()
+        xmlid = 'sales_double_approval.action_sale_approval_summary' \
+            if self.env['sale.approval.summary']._is_enabled() \
+            else 'sales_double_approval.action_sale_approval_log'
+        action = self.env['ir.actions.act_window']._for_xml_id(xmlid)
+        action['domain'] = [('company_id', '=', self.company_id.id)]
+        action['name'] = _("Approval Throughput")
+        return action
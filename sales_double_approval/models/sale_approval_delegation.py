@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    OpenERP, Open Source Management Solution
+#    Copyright (C) Wan Buffer Solution (<https://wanbuffer.com/>).
+#
+#    For Module Support : info@wanbuffer.com or Call : +91 9638442270
+#
+##############################################################################
+
+from odoo import api, fields, models, tools, _
+from odoo.exceptions import ValidationError
+from odoo.tools import frozendict
+
+
+class SaleApprovalDelegation(models.Model):
+    """Approver absence: the delegate approves in their place over the
+    period"""
+    _name = 'sale.approval.delegation'
+    _description = "Sale Order Approval Delegation"
+    _order = 'date_from desc, id desc'
+    _rec_name = 'user_id'
+
+    active = fields.Boolean(string="Active", default=True)
+    user_id = fields.Many2one(
+        'res.users', string="Approver", required=True, index=True,
+        default=lambda self: self.env.user,
+        domain="[('share', '=', False)]")
+    delegate_id = fields.Many2one(
+        'res.users', string="Delegate", required=True,
+        domain="[('share', '=', False)]",
+        help="User approving the orders of the approver over the period")
+    date_from = fields.Date(
+        string="From", required=True, default=fields.Date.context_today)
+    date_to = fields.Date(string="To", required=True)
+    note = fields.Char(string="Reason")
+
+    @api.constrains('user_id', 'delegate_id', 'date_from', 'date_to', 'active')
+    def _check_delegation(self):
+        for delegation in self:
+            if delegation.user_id == delegation.delegate_id:
+                raise ValidationError(_("An approver cannot delegate to themselves."))
+            if delegation.date_from > delegation.date_to:
+                raise ValidationError(_("The delegation must end after it starts."))
+        # one query for every delegation of the same approvers around the
+        # checked periods
+        candidates = self.search([
+            ('user_id', 'in', self.user_id.ids),
+            ('date_from', '<=', max(self.mapped('date_to'))),
+            ('date_to', '>=', min(self.mapped('date_from'))),
+        ])
+        for delegation in self.filtered('active'):
+            if any(other != delegation and other.user_id == delegation.user_id
+                   and other.date_from <= delegation.date_to
+                   and other.date_to >= delegation.date_from
+                   for other in candidates):
+                raise ValidationError(_(
+                    "%s already delegates their approvals over this period.",
+                    delegation.user_id.name))
+
+    @api.model
+    @tools.ormcache('day')
+    def _get_delegation_map(self, day):
+        """Effective approver of every approver absent on ``day``, as a
+        ``{approver_id: delegate_id}`` mapping. Chained delegations are
+        resolved up front, so a lookup is a single dictionary access.
+
+        The cache is keyed on the day, so delegations expire by themselves;
+        it is cleared whenever a delegation changes.
+        """
+        delegates = {
+            user.id: delegate.id
+            for user, delegate in self.sudo()._read_group(
+                [('date_from', '<=', day), ('date_to', '>=', day)],
+                ['user_id', 'delegate_id'])
+        }
+        effective = {}
+        for approver_id, delegate_id in delegates.items():
+            seen = {approver_id}
+            while delegate_id in delegates and delegate_id not in seen:
+                seen.add(delegate_id)
+                delegate_id = delegates[delegate_id]
+            effective[approver_id] = delegate_id
+        return frozendict(effective)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        delegations = super().create(vals_list)
+        self.env.registry.clear_cache()
+        self.env['sale.order']._bump_approval_queue_version()
+        return delegations
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env.registry.clear_cache()
+        self.env['sale.order']._bump_approval_queue_version()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        self.env['sale.order']._bump_approval_queue_version()
+        return res
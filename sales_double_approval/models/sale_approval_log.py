@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    OpenERP, Open Source Management Solution
+#    Copyright (C) Wan Buffer Solution (<https://wanbuffer.com/>).
+#
+#    For Module Support : info@wanbuffer.com or Call : +91 9638442270
+#
+##############################################################################
+
+import base64
+import csv
+import io
+import logging
+
+from dateutil.relativedelta import relativedelta
+
+from odoo import api, fields, models, tools, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+LOG_EXPORT_FIELDS = (
+    'id', 'date', 'action', 'order_name', 'user_id', 'approver_id',
+    'level', 'amount', 'wait_hours', 'company_id',
+)
+
+
+class SaleApprovalLog(models.Model):
+    """Append-only trail of the sale order approvals"""
+    _name = 'sale.approval.log'
+    _description = "Sale Order Approval Log"
+    _order = 'date desc, id desc'
+    _rec_name = 'order_name'
+
+    date = fields.Datetime(
+        string="Date", required=True, readonly=True, index=True,
+        default=fields.Datetime.now)
+    action = fields.Selection([
+        ('submitted', 'Submitted'),
+        ('stage_approved', 'Stage Approved'),
+        ('approved', 'Approved'),
+        ('rejected', 'Rejected'),
+    ], string="Action", required=True, readonly=True)
+    order_id = fields.Many2one(
+        'sale.order', string="Order", readonly=True, index=True,
+        ondelete='set null')
+    order_name = fields.Char(string="Order Reference", readonly=True)
+    company_id = fields.Many2one(
+        'res.company', string="Company", required=True, readonly=True)
+    user_id = fields.Many2one(
+        'res.users', string="Done By", required=True, readonly=True,
+        help="User who submitted, approved or rejected the order")
+    approver_id = fields.Many2one(
+        'res.users', string="Approver", readonly=True,
+        help="Approver of the tier the order fell into")
+    rule_id = fields.Many2one(
+        'sale.approval.rule', string="Approval Rule", readonly=True,
+        ondelete='set null')
+    level = fields.Char(string="Approval Level", readonly=True)
+    amount = fields.Monetary(
+        string="Amount", readonly=True, currency_field='currency_id',
+        help="Total amount of the order in company currency")
+    currency_id = fields.Many2one(
+        related='company_id.currency_id', string="Currency")
+    wait_hours = fields.Float(
+        string="Waiting Time (Hours)", readonly=True, aggregator='avg',
+        help="Time the order waited in the approval queue")
+
+    def init(self):
+        """Composite index for the per-approver compliance reports"""
+        tools.create_index(
+            self._cr, 'sale_approval_log_user_date_index', self._table,
+            ['user_id', 'date'])
+
+    def write(self, vals):
+        raise UserError(_("Approval log entries cannot be modified."))
+
+    def unlink(self):
+        if not self.env.context.get('approval_log_purge'):
+            raise UserError(_("Approval log entries cannot be deleted."))
+        return super().unlink()
+
+    @api.model
+    def _log(self, orders, action):
+        """Log ``action`` on every order with a single multi-row insert; the
+        waiting time of approvals and rejections is measured from the last
+        submission of each order, fetched with one grouped query."""
+        if not orders:
+            return self
+        now = fields.Datetime.now()
+        submitted_at = {}
+        if action != 'submitted':
+            submitted_at = {
+                order.id: date
+                for order, date in self.sudo()._read_group(
+                    [('order_id', 'in', orders.ids), ('action', '=', 'submitted')],
+                    ['order_id'], ['date:max'])
+            }
+        tiers = orders._get_approval_tiers()
+        return self.sudo().create([{
+            'date': now,
+            'action': action,
+            'order_id': order.id,
+            'order_name': order.name,
+            'company_id': order.company_id.id,
+            'user_id': self.env.uid,
+            'approver_id': tiers[order] and tiers[order].approver_id,
+            'rule_id': tiers[order] and tiers[order].rule_id,
+            'level': order.approval_level,
+            'amount': order.approval_amount,
+            'wait_hours': (now - submitted_at[order.id]).total_seconds() / 3600
+            if order.id in submitted_at else 0.0,
+        } for order in orders])
+
+    @api.model
+    def _cron_purge_old_logs(self, batch_size=10000):
+        """Archive then delete the entries older than the retention period
+        (``sales_double_approval.log_retention_months``, 0 keeps everything),
+        one month at a time: every month is exported to a CSV attachment and
+        deleted in batches, committing after each month."""
+        retention = int(self.env['ir.config_parameter'].sudo().get_param(
+            'sales_double_approval.log_retention_months', default=0))
+        if retention <= 0:
+            return
+        limit = fields.Datetime.now().replace(
+            day=1, hour=0, minute=0, second=0, microsecond=0,
+        ) - relativedelta(months=retention)
+        logs = self.sudo().with_context(approval_log_purge=True)
+        oldest = logs.search([('date', '<', limit)], order='date', limit=1)
+        month = oldest.date and oldest.date.replace(
+            day=1, hour=0, minute=0, second=0, microsecond=0)
+        while month and month < limit:
+            next_month = month + relativedelta(months=1)
+            domain = [('date', '>=', month), ('date', '<', min(next_month, limit))]
+            logs._archive_month(month, domain)
+            while True:
+                batch = logs.search(domain, limit=batch_size)
+                if not batch:
+                    break
+                batch.unlink()
+            _logger.info("Approval log: purged %s", month.strftime('%Y-%m'))
+            self.env.cr.commit()
+            month = next_month
+
+    @api.model
+    def _archive_month(self, month, domain):
+        """Export the entries of ``domain`` to a CSV attachment"""
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(LOG_EXPORT_FIELDS)
+        for row in self.search_read(domain, list(LOG_EXPORT_FIELDS[1:]), order='id'):
+            writer.writerow([
+                value[1] if isinstance(value, tuple) else value
+                for value in (row[field] for field in LOG_EXPORT_FIELDS)
+            ])
+        self.env['ir.attachment'].sudo().create({
+            'name': f"sale_approval_log_{month.strftime('%Y_%m')}.csv",
+            'res_model': self._name,
+            'mimetype': 'text/csv',
+            'datas': base64.b64encode(output.getvalue().encode()),
+        })
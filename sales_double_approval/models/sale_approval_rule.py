@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    OpenERP, Open Source Management Solution
+#    Copyright (C) Wan Buffer Solution (<https://wanbuffer.com/>).
+#
+#    For Module Support : info@wanbuffer.com or Call : +91 9638442270
+#
+##############################################################################
+
+from ast import literal_eval
+from operator import itemgetter
+
+from odoo import api, fields, models, _
+from odoo.exceptions import ValidationError
+from odoo.osv import expression
+
+from .approval_matrix import ApprovalCondition, ApprovalMatrix, ApprovalStage, ApprovalTier
+
+CONDITION_MODELS = {
+    'order': 'sale.order',
+    'line': 'sale.order.line',
+}
+
+
+class SaleApprovalRule(models.Model):
+    """Amount interval of the sale order approval matrix"""
+    _name = 'sale.approval.rule'
+    _description = "Sale Order Approval Rule"
+    _order = 'company_id, condition_type, currency_id, min_amount, sequence, id'
+
+    name = fields.Char(string="Name", required=True)
+    active = fields.Boolean(string="Active", default=True)
+    sequence = fields.Integer(string="Sequence", default=10)
+    condition_type = fields.Selection([
+        ('amount', 'Amount Interval'),
+        ('order', 'Order Condition'),
+        ('line', 'Order Line Condition'),
+    ], string="Trigger", required=True, default='amount',
+        help="Amount Interval: orders whose total falls within the interval.\n"
+             "Order Condition: orders matching the domain (e.g. customer on "
+             "credit hold, margin below a threshold).\n"
+             "Order Line Condition: orders with at least one line matching "
+             "the domain (e.g. discount above 15%, product category).")
+    condition_domain = fields.Char(
+        string="Condition", default="[]",
+        help="Domain evaluated on the orders or on their lines.")
+    condition_model = fields.Char(
+        string="Condition Model", compute='_compute_condition_model')
+    company_id = fields.Many2one(
+        'res.company', string="Company", required=True, index=True,
+        default=lambda self: self.env.company)
+    currency_id = fields.Many2one(
+        'res.currency', string="Currency", required=True,
+        default=lambda self: self.env.company.currency_id,
+        help="Orders in a currency without rules of its own are evaluated "
+             "on the rules of the company currency.")
+    min_amount = fields.Monetary(
+        string="Minimum Amount", required=True,
+        help="Orders with a total amount from this value require approval.")
+    max_amount = fields.Monetary(
+        string="Maximum Amount",
+        help="Upper bound (included) of the interval. Leave to 0 for an "
+             "open-ended rule.")
+    approver_id = fields.Many2one(
+        'res.users', string="Approver",
+        domain="[('share', '=', False)]",
+        help="User responsible for approving the orders of this interval. "
+             "Sales managers can always approve.")
+    stage_ids = fields.One2many(
+        'sale.approval.rule.stage', 'rule_id', string="Approval Chain",
+        copy=True,
+        help="Stages signed off one after the other; when empty the order "
+             "is approved by the approver alone.")
+    settings_row = fields.Integer(
+        string="Settings Row", readonly=True, copy=False,
+        help="Row of the Sale Order Approval settings table this rule is "
+             "edited from (0 if none).")
+
+    @api.depends('condition_type')
+    def _compute_condition_model(self):
+        for rule in self:
+            rule.condition_model = CONDITION_MODELS.get(rule.condition_type)
+
+    @api.constrains('condition_type', 'condition_domain')
+    def _check_condition_domain(self):
+        for rule in self.filtered(lambda rule: rule.condition_type != 'amount'):
+            try:
+                self.env[rule.condition_model]._search(rule._get_condition_domain())
+            except Exception as error:
+                raise ValidationError(_(
+                    "%(name)s: invalid condition: %(error)s",
+                    name=rule.name, error=error)) from error
+
+    def _get_condition_domain(self):
+        self.ensure_one()
+        return expression.normalize_domain(
+            literal_eval(self.condition_domain or '[]'))
+
+    @api.constrains('active', 'company_id', 'currency_id', 'min_amount',
+                    'max_amount', 'condition_type')
+    def _check_amount_intervals(self):
+        """Validate the intervals of every impacted company and currency"""
+        if self.env.context.get('approval_rules_batch'):
+            return
+        for company_id, currency_id in set(
+                (rule.company_id.id, rule.currency_id.id)
+                for rule in self if rule.condition_type == 'amount'):
+            rules = self.search([
+                ('company_id', '=', company_id),
+                ('currency_id', '=', currency_id),
+                ('condition_type', '=', 'amount'),
+            ])
+            self._check_sorted_intervals(
+                (rule.name, rule.min_amount, rule.max_amount or None)
+                for rule in rules)
+
+    @api.model
+    def _check_sorted_intervals(self, intervals):
+        """Check ``(name, min, max)`` intervals in a single pass over the rows
+        sorted on their minimum; ``max`` is None for an open-ended one."""
+        previous = None
+        for name, min_amount, max_amount in sorted(intervals, key=itemgetter(1)):
+            if max_amount is not None and min_amount >= max_amount:
+                raise ValidationError(_(
+                    "%s: Minimum amount must be less than maximum amount",
+                    name))
+            if previous and (previous[1] is None or min_amount <= previous[1]):
+                raise ValidationError(_(
+                    "%(name)s: Minimum amount must be greater than %(previous)s maximum",
+                    name=name, previous=previous[0]))
+            previous = (name, max_amount)
+
+    @api.model
+    def _compile_matrix(self, company_id):
+        """Build the :class:`ApprovalMatrix` of the given company, empty when
+        the company does not use the sale order approval"""
+        company = self.env['res.company'].sudo().browse(company_id)
+        if not company.so_double_validation:
+            return ApprovalMatrix(company.currency_id.id, ())
+        rules = self.sudo().search([('company_id', '=', company_id)])
+        stages = rules._get_compiled_stages()
+        conditions = [
+            ApprovalCondition(
+                ApprovalTier(rule.id, rule.name, None, None, None,
+                             rule.approver_id.id, rule.name, stages[rule.id]),
+                rule.condition_model,
+                tuple(rule._get_condition_domain()),
+            )
+            for rule in rules.filtered(
+                lambda rule: rule.condition_type != 'amount').sorted(
+                lambda rule: (rule.sequence, rule.id))
+        ]
+        tiers = []
+        for rule in rules.filtered(
+                lambda rule: rule.condition_type == 'amount').read(
+                ['name', 'currency_id', 'min_amount', 'max_amount', 'approver_id']):
+            max_amount = rule['max_amount'] or None
+            tiers.append(ApprovalTier(
+                rule['id'],
+                rule['name'],
+                rule['currency_id'][0],
+                rule['min_amount'],
+                max_amount,
+                rule['approver_id'] and rule['approver_id'][0],
+                ApprovalTier.format_level(
+                    rule['name'], rule['min_amount'], max_amount),
+                stages[rule['id']],
+            ))
+        return ApprovalMatrix(company.currency_id.id, tiers, conditions)
+
+    def _get_compiled_stages(self):
+        """:class:`ApprovalStage` tuples of every rule of self, by rule id"""
+        stages = {rule.id: [] for rule in self}
+        for stage in self.env['sale.approval.rule.stage'].sudo().search(
+                [('rule_id', 'in', self.ids)]):
+            stages[stage.rule_id.id].append(ApprovalStage(
+                stage.id, stage.name, stage.sequence,
+                tuple(stage.approver_ids.ids), stage.required_count))
+        return {rule_id: tuple(rule_stages) for rule_id, rule_stages in stages.items()}
+
+    @api.model
+    def _sync_settings_rows(self, company, rows):
+        """Mirror the rows of the settings table into the rules of
+        ``company``; a row without minimum and maximum archives its rule.
+
+        :param rows: iterable of ``(row, name, min, max, approver_id)``
+        """
+        old_matrices = self._get_current_matrices(company.ids)
+        batch = self.with_context(approval_rules_batch=True, active_test=False)
+        existing = {
+            rule.settings_row: rule
+            for rule in batch.search([
+                ('company_id', '=', company.id),
+                ('settings_row', '!=', 0),
+            ])
+        }
+        to_create = []
+        for row, name, min_amount, max_amount, approver_id in rows:
+            rule = existing.get(row)
+            if not min_amount and not max_amount:
+                if rule and rule.active:
+                    rule.active = False
+                continue
+            vals = {
+                'name': name,
+                'active': True,
+                'condition_type': 'amount',
+                'currency_id': company.currency_id.id,
+                'min_amount': min_amount,
+                'max_amount': max_amount or 0.0,
+                'approver_id': approver_id or False,
+            }
+            if rule:
+                rule.write(vals)
+            else:
+                to_create.append(dict(
+                    vals, company_id=company.id, settings_row=row))
+        if to_create:
+            batch.create(to_create)
+        self.with_context(approval_rules_batch=False).search([
+            ('company_id', '=', company.id),
+            ('condition_type', '=', 'amount'),
+        ])._check_amount_intervals()
+        return self._approval_rules_changed(company.ids, old_matrices)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        old_matrices = self._get_current_matrices({
+            vals.get('company_id') or self.env.company.id for vals in vals_list})
+        rules = super().create(vals_list)
+        rules._approval_rules_changed(rules.company_id.ids, old_matrices)
+        return rules
+
+    def write(self, vals):
+        company_ids = self.company_id.ids
+        if vals.get('company_id'):
+            company_ids = list(set(company_ids) | {vals['company_id']})
+        old_matrices = self._get_current_matrices(company_ids)
+        res = super().write(vals)
+        self._approval_rules_changed(company_ids, old_matrices)
+        return res
+
+    def unlink(self):
+        company_ids = self.company_id.ids
+        old_matrices = self._get_current_matrices(company_ids)
+        res = super().unlink()
+        self._approval_rules_changed(company_ids, old_matrices)
+        return res
+
+    @api.model
+    def _get_current_matrices(self, company_ids):
+        """Matrices of the companies before a change of their rules, so the
+        change can be re-evaluated incrementally; None in batch mode, the
+        batch taking care of the re-evaluation"""
+        if self.env.context.get('approval_rules_batch'):
+            return None
+        return {
+            company_id: self.env['sale.order']._get_approval_matrix(company_id)
+            for company_id in company_ids
+        }
+
+    @api.model
+    def _approval_rules_changed(self, company_ids, old_matrices=None):
+        """Drop the compiled matrices and re-evaluate the open orders: only
+        the orders within the amount bands affected by the change when the
+        previous matrices are given, all of them otherwise.
+
+        :return: the re-evaluation report, see
+            ``sale.order._reevaluate_approvals``
+        """
+        if self.env.context.get('approval_rules_batch'):
+            return None
+        self.env.registry.clear_cache()
+        self.env['sale.order']._bump_approval_queue_version()
+        if old_matrices is None:
+            changed_ids = self.env['sale.order']._recompute_approval_fields(
+                company_ids=company_ids)
+            return {'changed': changed_ids}
+        return self.env['sale.order']._reevaluate_approvals(old_matrices)
+
+
+class SaleApprovalRuleStage(models.Model):
+    """Stage of the approval chain of a rule"""
+    _name = 'sale.approval.rule.stage'
+    _description = "Sale Order Approval Stage"
+    _order = 'rule_id, sequence, id'
+
+    rule_id = fields.Many2one(
+        'sale.approval.rule', string="Approval Rule", required=True,
+        index=True, ondelete='cascade')
+    sequence = fields.Integer(string="Sequence", default=10)
+    name = fields.Char(string="Stage", required=True)
+    approver_ids = fields.Many2many(
+        'res.users', string="Approvers", required=True,
+        domain="[('share', '=', False)]")
+    required_count = fields.Integer(
+        string="Required Approvals", required=True, default=1,
+        help="Number of approvers who must approve the stage, e.g. 2 for "
+             "any 2 of 3 approvers; the approvers sign in parallel.")
+
+    @api.constrains('approver_ids', 'required_count')
+    def _check_required_count(self):
+        for stage in self:
+            if not 0 < stage.required_count <= len(stage.approver_ids):
+                raise ValidationError(_(
+                    "%(stage)s: the required approvals must be between 1 and "
+                    "the number of approvers.", stage=stage.name))
+
+    # stages do not change which orders require approval: only the compiled
+    # matrices are dropped
+    @api.model_create_multi
+    def create(self, vals_list):
+        stages = super().create(vals_list)
+        self.env.registry.clear_cache()
+        return stages
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
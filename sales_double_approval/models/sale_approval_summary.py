@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    OpenERP, Open Source Management Solution
+#    Copyright (C) Wan Buffer Solution (<https://wanbuffer.com/>).
+#
+#    For Module Support : info@wanbuffer.com or Call : +91 9638442270
+#
+##############################################################################
+
+import logging
+from datetime import datetime, time, timedelta
+
+from odoo import api, fields, models
+from odoo.tools import SQL, str2bool
+
+_logger = logging.getLogger(__name__)
+
+# Last day the summary was built, days rebuilt again before it at every
+# refresh, and days rebuilt per transaction
+REFRESHED_DATE_PARAM = 'sales_double_approval.summary_refreshed_date'
+REFRESH_TRAILING_DAYS = 1
+REFRESH_BATCH_DAYS = 31
+
+
+class SaleApprovalSummary(models.Model):
+    """Daily approval figures per company, approver, actor and rule,
+    materialized from the approval log by a cron"""
+    _name = 'sale.approval.summary'
+    _description = "Sale Order Approval Summary"
+    _order = 'date desc, id desc'
+    _rec_name = 'date'
+
+    date = fields.Date(string="Date", required=True, readonly=True, index=True)
+    company_id = fields.Many2one(
+        'res.company', string="Company", required=True, readonly=True)
+    approver_id = fields.Many2one(
+        'res.users', string="Approver", readonly=True)
+    user_id = fields.Many2one(
+        'res.users', string="Done By", required=True, readonly=True)
+    rule_id = fields.Many2one(
+        'sale.approval.rule', string="Approval Rule", readonly=True,
+        ondelete='set null')
+    submitted_count = fields.Integer(string="Submitted", readonly=True)
+    approved_count = fields.Integer(string="Approved", readonly=True)
+    rejected_count = fields.Integer(string="Rejected", readonly=True)
+    wait_hours = fields.Float(
+        string="Waiting Time (Hours)", readonly=True,
+        help="Total waiting time of the approved and rejected orders")
+
+    def init(self):
+        """One summary row per day and grouping key"""
+        self.env.cr.execute(SQL("""
+            CREATE UNIQUE INDEX IF NOT EXISTS sale_approval_summary_key_index
+                ON %s (date, company_id, user_id,
+                       (COALESCE(approver_id, 0)), (COALESCE(rule_id, 0)))
+        """, SQL.identifier(self._table)))
+
+    @api.model
+    def _is_enabled(self):
+        return str2bool(self.env['ir.config_parameter'].sudo().get_param(
+            'sales_double_approval.dashboard_summary', default='False'))
+
+    @api.model
+    def _cron_refresh(self, batch_days=REFRESH_BATCH_DAYS):
+        """Rebuild from the approval log the summary of the days since the
+        last run, ``batch_days`` days per transaction.
+
+        Log entries are dated when created but only visible once their
+        transaction commits, possibly after a run went past their date: the
+        last REFRESH_TRAILING_DAYS days before the last run are rebuilt
+        again, so such entries are still folded. Days are rebuilt rather
+        than incremented, so rebuilding a day never counts an entry twice.
+        """
+        if not self._is_enabled():
+            return
+        icp = self.env['ir.config_parameter'].sudo()
+        self.env['sale.approval.log'].flush_model()
+        refreshed = fields.Date.to_date(icp.get_param(REFRESHED_DATE_PARAM))
+        if refreshed:
+            day = refreshed - timedelta(days=REFRESH_TRAILING_DAYS)
+        else:
+            self.env.cr.execute("SELECT MIN(date)::date FROM sale_approval_log")
+            day = self.env.cr.fetchone()[0]
+            if not day:
+                return
+        today = fields.Date.today()
+        while day <= today:
+            last_day = min(day + timedelta(days=batch_days - 1), today)
+            self.env.cr.execute(SQL("""
+                DELETE FROM sale_approval_summary
+                 WHERE date >= %(day)s AND date <= %(last_day)s
+            """, day=day, last_day=last_day))
+            self.env.cr.execute(SQL("""
+                INSERT INTO sale_approval_summary
+                       (date, company_id, user_id, approver_id, rule_id,
+                        submitted_count, approved_count, rejected_count, wait_hours,
+                        create_uid, create_date, write_uid, write_date)
+                SELECT date::date, company_id, user_id, approver_id, rule_id,
+                       COUNT(*) FILTER (WHERE action = 'submitted'),
+                       COUNT(*) FILTER (WHERE action = 'approved'),
+                       COUNT(*) FILTER (WHERE action = 'rejected'),
+                       COALESCE(SUM(wait_hours) FILTER (WHERE action IN ('approved', 'rejected')), 0),
+                       %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+                  FROM sale_approval_log
+                 WHERE date >= %(start)s AND date < %(stop)s
+              GROUP BY date::date, company_id, user_id, approver_id, rule_id
+            """, uid=self.env.uid,
+                start=datetime.combine(day, time.min),
+                stop=datetime.combine(last_day + timedelta(days=1), time.min)))
+            icp.set_param(REFRESHED_DATE_PARAM, fields.Date.to_string(last_day))
+            self.env.cr.commit()
+            day = last_day + timedelta(days=1)
+        self.invalidate_model()
+        _logger.info("Approval summary refreshed up to %s", today)
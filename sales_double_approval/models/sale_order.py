@@ -8,8 +8,55 @@
 #
 ##############################################################################
 
-from odoo import api, fields, models, _
+import functools
+import logging
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+import psycopg2.errors
+from dateutil.relativedelta import relativedelta
+
+from markupsafe import Markup
+
+from odoo import api, fields, models, tools, Command, _
 from odoo.exceptions import UserError
+from odoo.osv import expression
+from odoo.tools import SQL, config, split_every, str2bool
+
+from .approval_matrix import ApprovalTier
+from .approval_metrics import instrumented
+
+_logger = logging.getLogger(__name__)
+
+# Orders whose approval evaluation still matters
+OPEN_STATES = ('draft', 'to_approve', 'sent')
+# States in which the approval evaluation of a submitted order is frozen,
+# and those in which changing its lines sends it back to draft
+FROZEN_STATES = ('to_approve', 'sent', 'sale')
+RESUBMIT_STATES = ('to_approve', 'sent')
+# Line fields covered by the fingerprint of an order submitted for approval
+APPROVAL_LINE_FIELDS = ('product_id', 'product_uom_qty', 'price_unit', 'discount',
+                        'tax_id', 'display_type')
+# Order fields whose change moves an order in or out of an approval queue
+QUEUE_FIELDS = {'state', 'approval_escalated_to_id', 'approval_claimed_by_id'}
+# Automatic retries of a failed approval e-mail
+MAX_MAIL_RETRIES = 3
+# Minutes an approver keeps the orders claimed from the approval queue, and
+# orders claimed at once from the menu
+CLAIM_TIMEOUT = 30
+CLAIM_BATCH_SIZE = 10
+# Orders re-evaluated per batch when the approval rules change
+REEVALUATION_BATCH_SIZE = 1000
+# Orders escalated per transaction, seconds an escalation run may last at
+# most, and share of the real time limit of the cron workers it may use
+ESCALATION_BATCH_SIZE = 200
+ESCALATION_TIME_LIMIT = 240
+ESCALATION_TIME_SHARE = 0.5
+# Placeholders of the order body and generation date in the cached shell of
+# the approval request e-mail
+APPROVAL_MAIL_BODY = '<!--approval-mail-body-->'
+APPROVAL_MAIL_DATE = '<!--approval-mail-date-->'
 
 
 class SaleOrder(models.Model):
@@ -24,308 +71,1602 @@ class SaleOrder(models.Model):
         ('cancel', 'Cancelled'),
     ], string='Status', readonly=True, copy=False, index=True, tracking=3, default='draft')
     
+    approval_currency_id = fields.Many2one(
+        related='company_id.currency_id',
+        string="Approval Currency"
+    )
+
+    approval_amount = fields.Monetary(
+        string="Approval Amount",
+        compute="_compute_approval_amount",
+        store=True,
+        currency_field='approval_currency_id',
+        help="Total amount converted in the company currency at the order "
+             "date, evaluated against the company approval rules"
+    )
+
     approval_required = fields.Boolean(
         string="Approval Required", 
         compute="_compute_approval_required",
+        store=True,
+        index=True,
         help="Indicates if this order requires approval based on amount ranges"
     )
     
     approval_level = fields.Char(
         string="Approval Level", 
         compute="_compute_approval_required",
+        store=True,
+        index=True,
         help="Shows which approval range this order falls into"
     )
     
     can_approve = fields.Boolean(
         string="Can Approve", 
         compute="_compute_can_approve",
+        search="_search_can_approve",
         help="Indicates if current user can approve this order"
     )
+
+    approval_request_date = fields.Datetime(
+        string="Approval Request Date",
+        copy=False,
+        readonly=True,
+        help="Last time the order was sent for approval"
+    )
+
+    approval_stage_ids = fields.One2many(
+        'sale.order.approval.stage',
+        'order_id',
+        string="Approval Stages",
+        copy=False,
+        readonly=True,
+        help="Progress of the order through the approval chain of its rule"
+    )
+
+    approval_escalation_date = fields.Datetime(
+        string="Approval Escalation Date",
+        copy=False,
+        readonly=True,
+        help="Last time the overdue approval request was escalated"
+    )
+
+    approval_escalated_to_id = fields.Many2one(
+        'res.users',
+        string="Escalated To",
+        copy=False,
+        readonly=True,
+        help="User the overdue approval request was escalated to; they can "
+             "approve the order in addition to the approver of its rule"
+    )
+
+    approval_claimed_by_id = fields.Many2one(
+        'res.users',
+        string="Claimed By",
+        copy=False,
+        readonly=True,
+        help="Approver working on the order, see Claim Next Approvals"
+    )
+
+    approval_claim_date = fields.Datetime(
+        string="Claimed On",
+        copy=False,
+        readonly=True
+    )
+
+    approval_rule_id = fields.Many2one(
+        'sale.approval.rule',
+        string="Approval Rule",
+        copy=False,
+        readonly=True,
+        ondelete='set null',
+        help="Main approval rule the order fired when it was sent for approval"
+    )
+
+    approval_approver_id = fields.Many2one(
+        'res.users',
+        string="Approver",
+        copy=False,
+        readonly=True,
+        help="Approver of the main rule when the order was sent for approval"
+    )
+
+    approval_approver_ids = fields.Many2many(
+        'res.users',
+        'sale_order_approval_approver_rel',
+        'order_id',
+        'user_id',
+        string="Approvers",
+        copy=False,
+        readonly=True,
+        help="Approvers of every rule the order fired when it was sent for "
+             "approval"
+    )
+
+    approval_lines_hash = fields.Char(
+        string="Approval Lines Fingerprint",
+        copy=False,
+        readonly=True,
+        help="Fingerprint of the order lines when the order was sent for "
+             "approval. While it is set, the approval evaluation above is "
+             "frozen; changing the lines sends the order back to draft."
+    )
+
+    approval_mail_id = fields.Many2one(
+        'mail.mail',
+        string="Approval E-mail",
+        copy=False,
+        readonly=True,
+        help="Last approval request e-mail sent to the approver"
+    )
+
+    approval_mail_state = fields.Selection(
+        related='approval_mail_id.state',
+        string="Approval E-mail Status"
+    )
+
+    approval_mail_failure = fields.Text(
+        related='approval_mail_id.failure_reason',
+        string="Approval E-mail Failure"
+    )
+
+    approval_mail_retry_count = fields.Integer(
+        string="Approval E-mail Retries",
+        copy=False,
+        readonly=True,
+        help="Number of times the approval e-mail was put back in the queue"
+    )
     
-    
-    def _get_approval_ranges(self):
-        """Get all approval ranges configuration - FIXED: No object caching"""
-        get_param = self.env['ir.config_parameter'].sudo().get_param
-        
+    def init(self):
+        """Partial index backing the 'To Approve Quotation' queue"""
+        super().init()
+        tools.create_index(
+            self._cr, 'sale_order_to_approve_state_index', self._table,
+            ['state'], where="state = 'to_approve'")
+        # amount range lookups of the incremental re-evaluation
+        open_states = ", ".join(f"'{state}'" for state in OPEN_STATES)
+        tools.create_index(
+            self._cr, 'sale_order_open_approval_amount_index', self._table,
+            ['company_id', 'approval_amount'], where=f"state IN ({open_states})")
+        tools.create_index(
+            self._cr, 'sale_order_open_amount_total_index', self._table,
+            ['company_id', 'currency_id', 'amount_total'],
+            where=f"state IN ({open_states})")
+        # version of the approval queues, see _bump_approval_queue_version
+        self._cr.execute(
+            "CREATE SEQUENCE IF NOT EXISTS sale_approval_queue_version")
+
+    def write(self, vals):
+        res = super().write(vals)
+        if QUEUE_FIELDS.intersection(vals):
+            self._bump_approval_queue_version()
+        return res
+
+    @api.model
+    def _bump_approval_queue_version(self):
+        """Move the version of the approval queues on once the transaction is
+        committed, so the ETags of the pending approvals API change only
+        when the new state of the queues is visible. The version is a
+        sequence: bumping it takes no lock and never conflicts."""
+        postcommit = self.env.cr.postcommit
+        if postcommit.data.get('sale_approval_queue_version'):
+            return
+        postcommit.data['sale_approval_queue_version'] = True
+        registry = self.env.registry
+
+        @postcommit.add
+        def bump():
+            with registry.cursor() as cr:
+                cr.execute("SELECT nextval('sale_approval_queue_version')")
+
+    @api.model
+    def _get_approval_queue_version(self):
+        """Current version of the approval queues"""
+        self.env.cr.execute("SELECT last_value FROM sale_approval_queue_version")
+        return self.env.cr.fetchone()[0]
+
+    @api.model
+    @tools.ormcache('company_id')
+    def _get_approval_matrix(self, company_id):
+        """Compiled approval rules of a company, built once per registry. The
+        cache is cleared (on every worker) whenever a rule changes."""
+        return self.env['sale.approval.rule']._compile_matrix(company_id)
+
+    def _get_approval_matrices(self):
+        """Compiled matrix of every company of the orders, by company id"""
         return {
-            'range1': {
-                'min': float(get_param('sales_double_approval.so_min_amount', default=0.0)),
-                'max': float(get_param('sales_double_approval.so_max_amount', default=1000.0)),
-                'approver': get_param('sales_double_approval.approval'),
-                'name': 'Range 1'
-            },
-            'range2': {
-                'min': float(get_param('sales_double_approval.so_min_amount2', default=1001.0)),
-                'max': float(get_param('sales_double_approval.so_max_amount2', default=5000.0)),
-                'approver': get_param('sales_double_approval.approval2'),
-                'name': 'Range 2'
-            },
-            'range3': {
-                'min': float(get_param('sales_double_approval.so_min_amount3', default=5001.0)),
-                'max': None,  # last range is open-ended
-                'approver': get_param('sales_double_approval.approval3'),
-                'name': 'Range 3'
-            }
+            company_id: self._get_approval_matrix(company_id)
+            for company_id in set(self.company_id.ids) | {self.env.company.id}
+        }
+
+    @instrumented
+    def _get_approval_matches(self, matrices=None):
+        """Every tier fired by every order: its amount tier first, then its
+        condition rules in sequence. The condition predicates run once per
+        company over the whole recordset."""
+        if matrices is None:
+            matrices = self._get_approval_matrices()
+        frozen = self._filter_frozen_approvals()
+        matches = {
+            order: [order._get_snapshot_tier(
+                matrices[order.company_id.id or self.env.company.id])]
+            if order.approval_rule_id else []
+            for order in frozen
         }
+        live = self - frozen
+        company_ids = set()
+        for order in live:
+            company_id = order.company_id.id or self.env.company.id
+            matrix = matrices[company_id]
+            tier = matrix.match_amounts(
+                order.amount_total, order.currency_id.id, order.approval_amount)
+            matches[order] = [tier] if tier else []
+            if matrix.conditions:
+                company_ids.add(company_id)
+        for company_id in company_ids:
+            orders = live.filtered(
+                lambda order: (order.company_id.id or self.env.company.id) == company_id)
+            for condition in matrices[company_id].conditions:
+                fired_ids = condition.matching_ids(orders)
+                for order in orders:
+                    if order.id in fired_ids:
+                        matches[order].append(condition.tier)
+        return matches
+
+    def _filter_frozen_approvals(self):
+        """Orders submitted for approval whose evaluation is frozen: they
+        keep the rule and approver recorded at submission"""
+        return self.filtered(
+            lambda order: order.state in FROZEN_STATES and order.approval_lines_hash)
+
+    @api.model
+    def _get_frozen_approval_domain(self, frozen=True):
+        """Domain of the orders whose approval evaluation is frozen, or of
+        those evaluated against the live rules"""
+        if frozen:
+            return [('state', 'in', FROZEN_STATES), ('approval_lines_hash', '!=', False)]
+        return ['|', ('state', 'not in', FROZEN_STATES), ('approval_lines_hash', '=', False)]
+
+    def _get_snapshot_tier(self, matrix):
+        """:class:`ApprovalTier` recorded when the order was submitted: the
+        current tier of its rule (for its chain and escalation), with the
+        approver of the time; a deleted rule leaves a bare tier"""
+        self.ensure_one()
+        rule_id = self.approval_rule_id.id
+        tier = next((tier for tier in matrix.all_tiers if tier.rule_id == rule_id), None)
+        if tier is None:
+            tier = ApprovalTier(rule_id, self.approval_level, None, None, None,
+                                False, self.approval_level)
+        return tier._replace(approver_id=self.approval_approver_id.id)
 
+    def _get_approval_tiers(self, matrices=None):
+        """Main :class:`ApprovalTier` (or None) of every order, each company
+        matrix being resolved once for the whole recordset"""
+        return {
+            order: tiers[0] if tiers else None
+            for order, tiers in self._get_approval_matches(matrices).items()
+        }
 
     def _get_amount_range_info(self, amount):
-        """Get range information for given amount"""
-        ranges = self._get_approval_ranges()
-
-        # check normal ranges
-        for range_key, range_config in ranges.items():
-            min_amt = range_config['min']
-            max_amt = range_config['max']
-            range_name = range_config['name']
-            approver = range_config['approver']
-
-            # last range (open-ended)
-            if max_amt is None and amount >= min_amt:
-                return {
-                    'required': True,
-                    'level': f"{range_name} (>= {min_amt})",
-                    'approver': approver
-                }
+        """Get range information for given amount, in the currency of the
+        order: it is converted in the company currency at the rate of the
+        order date, as ``approval_amount``"""
+        company = self.company_id[:1] or self.env.company
+        currency = self.currency_id[:1] or company.currency_id
+        company_amount = amount
+        if currency != company.currency_id:
+            day = fields.Date.to_date(self[:1].date_order) or fields.Date.today()
+            rates = (currency | company.currency_id)._get_rates_by_day(company, {day})
+            company_amount = company.currency_id.round(
+                amount * rates[company.currency_id.id, day] / rates[currency.id, day])
+        tier = self._get_approval_matrix(company.id).match_amounts(
+            amount, currency.id, company_amount)
+        if not tier:
+            return {'required': False, 'level': '', 'approver': None}
+        return {
+            'required': True,
+            'level': tier.level,
+            'approver': tier.approver_id,
+        }
 
-            # normal ranges
-            if max_amt is not None and min_amt <= amount <= max_amt:
-                return {
-                    'required': True,
-                    'level': f"{range_name} ({min_amt}-{max_amt})",
-                    'approver': approver
-                }
+    @api.depends('amount_total', 'currency_id', 'company_id', 'date_order',
+                 'state')
+    @instrumented
+    def _compute_approval_amount(self):
+        """Convert the totals in company currency in one pass, the rates of
+        every (currency, day) of the batch being fetched with one query. The
+        amount of a frozen order is the one it was submitted with."""
+        to_convert = defaultdict(list)
+        for order in self - self._filter_frozen_approvals():
+            company = order.company_id or self.env.company
+            if not order.currency_id or order.currency_id == company.currency_id:
+                order.approval_amount = order.amount_total
+            else:
+                to_convert[company].append(order.id)
+        for company, order_ids in to_convert.items():
+            orders = self.browse(order_ids)
+            days = {
+                fields.Date.to_date(order.date_order) or fields.Date.today()
+                for order in orders
+            }
+            rates = (orders.currency_id | company.currency_id)._get_rates_by_day(
+                company, days)
+            for order in orders:
+                day = fields.Date.to_date(order.date_order) or fields.Date.today()
+                order.approval_amount = company.currency_id.round(
+                    order.amount_total
+                    * rates[company.currency_id.id, day]
+                    / rates[order.currency_id.id, day])
 
-        # if no range matches
-        return {'required': False, 'level': '', 'approver': None}
-    
-    @api.depends('amount_total')
+    @api.depends('amount_total', 'currency_id', 'company_id', 'approval_amount',
+                 'partner_id', 'order_line.discount', 'order_line.product_id',
+                 'state')
+    @instrumented
     def _compute_approval_required(self):
-        """Check if amount falls within any of the configured approval ranges,
-        ignoring ranges with 0 values."""
-        for order in self:
-            ranges = order._get_approval_ranges()
-            is_in_range = False
-            range_level = ""
+        """Check if the order falls within any of the configured approval
+        rules; the level lists every rule it fires. Frozen orders keep the
+        evaluation they were submitted with."""
+        live = self - self._filter_frozen_approvals()
+        matches = live._get_approval_matches()
+        for order in live:
+            tiers = matches[order]
+            order.approval_required = bool(tiers)
+            order.approval_level = ", ".join(tier.level for tier in tiers)
 
-            for range_key, range_config in ranges.items():
-                min_amt = range_config['min']
-                max_amt = range_config['max']
-                range_name = range_config['name']
+    @api.model
+    @instrumented
+    def _recompute_approval_fields(self, states=OPEN_STATES, company_ids=None):
+        """Re-evaluate the stored approval fields against the current matrices
+        with one UPDATE per company, instead of recomputing orders one by one.
+
+        :param states: only update orders in these states, None for all
+        :param company_ids: only update orders of these companies, None for all
+        :return: ids of the orders whose approval fields changed
+        """
+        self.flush_model(['amount_total', 'approval_amount', 'state', 'company_id',
+                          'currency_id', 'approval_required', 'approval_level',
+                          'approval_lines_hash'])
+        if company_ids is None:
+            company_ids = self.env['res.company'].sudo().search([]).ids
+        changed_ids = []
+        for company_id in company_ids:
+            matrix = self._get_approval_matrix(company_id)
+            if matrix.conditions:
+                domain = [('company_id', '=', company_id)] \
+                    + self._get_frozen_approval_domain(frozen=False)
+                if states:
+                    domain.append(('state', 'in', tuple(states)))
+                orders = self.sudo().with_context(active_test=False).search(domain)
+                changed_ids += orders._recompute_approval_fields_batch()
+            else:
+                changed_ids += self._recompute_company_approval_fields(company_id, states)
+        self.invalidate_model(['approval_required', 'approval_level'])
+        return changed_ids
 
-                # Skip invalid/unset ranges (0 or None)
-                if not min_amt and not max_amt:
+    @api.model
+    @instrumented
+    def _reevaluate_approvals(self, old_matrices, states=OPEN_STATES,
+                              batch_size=REEVALUATION_BATCH_SIZE):
+        """Re-evaluate the orders a change of the approval rules may affect:
+        only those within the amount bands where the previous and current
+        matrices differ, found with indexed range queries, are recomputed,
+        in batches. The approval activities of the waiting orders whose
+        approver changed are reassigned.
+
+        :param old_matrices: ``{company_id: matrix}`` before the change
+        :return: ``{'changed': ids, 'required': ids, 'released': ids,
+            'approver': ids}`` -- orders whose approval fields changed, now
+            requiring approval, no longer requiring it, and whose approver
+            changed
+        """
+        report = {'changed': [], 'required': [], 'released': [], 'approver': []}
+        self.flush_model(['amount_total', 'approval_amount', 'state', 'company_id',
+                          'currency_id', 'approval_required', 'approval_level',
+                          'approval_lines_hash'])
+        for company_id, old_matrix in old_matrices.items():
+            matrix = self._get_approval_matrix(company_id)
+            domain = [('company_id', '=', company_id)] \
+                + self._get_frozen_approval_domain(frozen=False)
+            if states:
+                domain.append(('state', 'in', tuple(states)))
+            if old_matrix.conditions == matrix.conditions:
+                band = self._get_approval_band_domain(
+                    matrix, old_matrix, matrix.changed_bands(old_matrix))
+                if band == expression.FALSE_DOMAIN:
                     continue
+                domain = expression.AND([domain, band])
+            # else condition rules changed: any order may be affected
+            order_ids = self.sudo().with_context(active_test=False)._search(domain)
+            for batch_ids in split_every(batch_size, list(order_ids)):
+                orders = self.sudo().browse(batch_ids)
+                old_tiers = orders._get_approval_tiers({company_id: old_matrix})
+                required = {order.id: order.approval_required for order in orders}
+                report['changed'] += orders._recompute_approval_fields_batch()
+                new_tiers = orders._get_approval_tiers({company_id: matrix})
+                for order in orders:
+                    old_approver = old_tiers[order] and old_tiers[order].approver_id
+                    new_approver = new_tiers[order] and new_tiers[order].approver_id
+                    if order.approval_required and not required[order.id]:
+                        report['required'].append(order.id)
+                    elif required[order.id] and not order.approval_required:
+                        report['released'].append(order.id)
+                    elif order.approval_required and old_approver != new_approver:
+                        report['approver'].append(order.id)
+                orders.invalidate_recordset()
 
-                if max_amt is None:  # open-ended range
-                    if order.amount_total >= min_amt:
-                        is_in_range = True
-                        range_level = f"{range_name} (>= {min_amt})"
-                        break
-                else:  # closed range
-                    if min_amt <= order.amount_total <= max_amt:
-                        is_in_range = True
-                        range_level = f"{range_name} ({min_amt} - {max_amt})"
-                        break
-
-            order.approval_required = is_in_range
-            order.approval_level = range_level
-
-
-    # @api.depends('amount_total')
-    # def _compute_approval_required(self):
-    #     """Check if amount falls within any of the three approval ranges"""
-    #     for order in self:
-    #         # Get all ranges configuration
-    #         ranges = order._get_approval_ranges()
-    #         is_in_range = False
-    #         range_level = ""
-
-    #         # Check each range
-    #         for range_key, range_config in ranges.items():
-    #             min_amt = range_config['min']
-    #             max_amt = range_config['max']
-    #             range_name = range_config['name']
-
-    #             # Check if amount falls in current range
-    #             if max_amt is None:  # For Range 3 (open-ended)
-    #                 if order.amount_total >= min_amt:
-    #                     is_in_range = True
-    #                     range_level = f"{range_name} (>= {min_amt})"
-    #                     break
-    #             else:  # For Range 1 and 2
-    #                 if min_amt <= order.amount_total <= max_amt:
-    #                     is_in_range = True
-    #                     range_level = f"{range_name} ({min_amt} - {max_amt})"
-    #                     break
-
-    #         order.approval_required = is_in_range
-    #         order.approval_level = range_level
+        moved = self.sudo().browse(report['approver']).filtered(
+            lambda order: order.state == 'to_approve')
+        if moved:
+            moved._get_approval_activities().unlink()
+            moved._create_approval_activities()
+        if any(report.values()):
+            _logger.info(
+                "Approval rules changed: %s order(s) re-evaluated, %s now "
+                "require approval, %s no longer do, %s changed approver",
+                len(report['changed']), len(report['required']),
+                len(report['released']), len(report['approver']))
+        return report
 
-    
-    @api.depends('amount_total', 'approval_level')
+    @api.model
+    def _get_approval_band_domain(self, matrix, old_matrix, bands):
+        """Domain of the orders whose amount falls within ``bands`` (see
+        :meth:`ApprovalMatrix.changed_bands`)"""
+        # orders of a currency with tiers of its own before or after the
+        # change are only affected through the bands of that currency
+        own_currencies = list(
+            (matrix.currency_ids | old_matrix.currency_ids) - {matrix.currency_id})
+        domains = []
+        for currency_id, intervals in bands.items():
+            if intervals is None:
+                domains.append([('currency_id', '=', currency_id)])
+                continue
+            if currency_id == matrix.currency_id:
+                base = [('currency_id', 'not in', own_currencies)] if own_currencies else []
+                amount_field = 'approval_amount'
+            else:
+                base = [('currency_id', '=', currency_id)]
+                amount_field = 'amount_total'
+            for min_amount, max_amount in intervals:
+                band = base + [(amount_field, '>=', min_amount)]
+                if max_amount is not None:
+                    band.append((amount_field, '<=', max_amount))
+                domains.append(band)
+        return expression.OR(domains) if domains else expression.FALSE_DOMAIN
+
+    def _refresh_approval_conditions(self):
+        """Evaluate again the approval fields of the draft orders of the
+        companies with condition rules. Their domains may involve any data
+        (customer on credit hold, product costs...) the stored fields do not
+        depend on, so they are checked against the live data before an order
+        is confirmed or submitted."""
+        drafts = self.filtered(lambda order: order.state == 'draft' and self._get_approval_matrix(
+            order.company_id.id or self.env.company.id).conditions)
+        if drafts:
+            drafts._recompute_approval_fields_batch()
+
+    def _recompute_approval_fields_batch(self):
+        """Recompute the approval fields of self through the batch compute
+        (condition rules cannot be expressed as a single UPDATE)
+
+        :return: ids of the orders whose approval fields changed
+        """
+        before = {
+            order.id: (order.approval_required, order.approval_level or '')
+            for order in self
+        }
+        for field_name in ('approval_required', 'approval_level'):
+            self.env.add_to_compute(self._fields[field_name], self)
+        self.flush_recordset(['approval_required', 'approval_level'])
+        return [
+            order.id for order in self
+            if before[order.id] != (order.approval_required, order.approval_level or '')
+        ]
+
+    @api.model
+    def _recompute_company_approval_fields(self, company_id, states):
+        """Single UPDATE evaluating the amount tiers of a company"""
+        matrix = self._get_approval_matrix(company_id)
+        # orders in a currency without tiers fall back on the company ones
+        own_currencies = tuple(matrix.currency_ids - {matrix.currency_id})
+        required_cases, level_cases = [], []
+        for tier in matrix.tiers:
+            if tier.currency_id != matrix.currency_id:
+                currency = SQL("currency_id = %s", tier.currency_id)
+            elif own_currencies:
+                currency = SQL("currency_id NOT IN %s", own_currencies)
+            else:
+                currency = SQL("TRUE")
+            # company tiers are evaluated on the converted amount
+            column = SQL("amount_total") if tier.currency_id != matrix.currency_id \
+                else SQL("approval_amount")
+            if tier.max_amount is None:
+                amount = SQL("%s >= %s", column, tier.min_amount)
+            else:
+                amount = SQL("%s BETWEEN %s AND %s",
+                             column, tier.min_amount, tier.max_amount)
+            condition = SQL("%s AND %s", currency, amount)
+            required_cases.append(SQL("WHEN %s THEN TRUE", condition))
+            level_cases.append(SQL("WHEN %s THEN %s", condition, tier.level))
+        if required_cases:
+            required = SQL("CASE %s ELSE FALSE END", SQL(" ").join(required_cases))
+            level = SQL("CASE %s ELSE NULL END", SQL(" ").join(level_cases))
+        else:
+            required, level = SQL("FALSE"), SQL("NULL::varchar")
+        # frozen orders keep the evaluation they were submitted with
+        where = SQL(
+            "company_id = %s AND NOT (state IN %s AND approval_lines_hash IS NOT NULL)",
+            company_id, FROZEN_STATES)
+        if states:
+            where = SQL("%s AND state IN %s", where, tuple(states))
+        self.env.cr.execute(SQL("""
+            UPDATE sale_order so
+               SET approval_required = new.required,
+                   approval_level = new.level
+              FROM (SELECT id, %(required)s AS required, %(level)s AS level
+                      FROM sale_order
+                     WHERE %(where)s) new
+             WHERE so.id = new.id
+               AND (so.approval_required, so.approval_level)
+                   IS DISTINCT FROM (new.required, new.level)
+         RETURNING so.id
+        """, required=required, level=level, where=where))
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.depends('amount_total', 'currency_id', 'company_id', 'approval_required',
+                 'partner_id', 'order_line.discount', 'order_line.product_id',
+                 'approval_escalated_to_id', 'approval_stage_ids.state',
+                 'approval_stage_ids.approved_user_ids', 'state',
+                 'approval_approver_ids', 'approval_lines_hash')
+    @api.depends_context('uid')
+    @instrumented
     def _compute_can_approve(self):
-        """Check if current user can approve based on amount range - FIXED"""
-        current_user_id = self.env.user.id
-        is_sales_manager = self.env.user.has_group('sales_team.group_sale_manager')
-        
-        for order in self:
-            if not order.approval_required:
-                order.can_approve = True
+        """Check if current user can approve based on amount range; the
+        tiers of the current user are resolved once for the whole batch.
+        Orders in an approval chain are approved by the approvers of their
+        current stage only, frozen orders by the approvers recorded when
+        they were submitted."""
+        approver_ids = self._get_represented_approver_ids()
+        chained = self.filtered(lambda order: any(
+            stage.state == 'pending' for stage in order.approval_stage_ids))
+        for order in chained:
+            order.can_approve = any(
+                approver_ids & set(stage.approver_ids.ids)
+                and self.env.uid not in stage.approved_user_ids.ids
+                for stage in order.approval_stage_ids if stage.state == 'pending')
+        orders = self - chained
+
+        # Fallback: Sales manager can always approve
+        if self.env.user.has_group('sales_team.group_sale_manager'):
+            orders.can_approve = True
+            return
+
+        matrices = self._get_approval_matrices()
+        user_rule_ids = {
+            tier.rule_id
+            for matrix in matrices.values()
+            for tier in matrix.all_tiers
+            if tier.approver_id in approver_ids and not tier.stages
+        }
+        frozen = orders._filter_frozen_approvals()
+        matches = (orders - frozen)._get_approval_matches(matrices) if user_rule_ids else {}
+        for order in orders:
+            if order in frozen:
+                order.can_approve = not order.approval_required \
+                    or order.approval_escalated_to_id.id == self.env.uid \
+                    or bool(approver_ids & set(order.approval_approver_ids.ids))
                 continue
-            
-            range_info = order._get_amount_range_info(order.amount_total)
-            approver_id = range_info.get('approver')
-            
-            can_approve = False
-            if approver_id:
-                try:
-                    if int(approver_id) == current_user_id:
-                        can_approve = True
-                except (ValueError, TypeError):
-                    pass
-            
-            # Fallback: Sales manager can always approve
-            if not can_approve and is_sales_manager:
-                can_approve = True
-                
-            order.can_approve = can_approve
+            order.can_approve = not order.approval_required \
+                or order.approval_escalated_to_id.id == self.env.uid \
+                or any(tier.rule_id in user_rule_ids for tier in matches.get(order, ()))
+
+    @instrumented
+    def _search_can_approve(self, operator, value):
+        """Orders the current user can approve, as a SQL-friendly domain on
+        the amount intervals and conditions of the rules they approve"""
+        if operator not in ('=', '!='):
+            raise UserError(_("Unsupported search on Can Approve."))
+        positive = (operator == '=') == bool(value)
+        approver_ids = self._get_represented_approver_ids()
+        # orders in an approval chain are approved by the approvers of their
+        # current stage only, as in _compute_can_approve
+        unchained = [('approval_stage_ids', 'not any', [('state', '=', 'pending')])]
+        stage_domain = [('approval_stage_ids', 'any', [
+            ('state', '=', 'pending'),
+            ('approver_ids', 'in', list(approver_ids)),
+            ('approved_user_ids', 'not in', [self.env.uid]),
+        ])]
+        if self.env.user.has_group('sales_team.group_sale_manager'):
+            domain = expression.OR([unchained, stage_domain])
+            return domain if positive else ['!'] + domain
+
+        domains = [
+            [('approval_required', '=', False)] + unchained,
+            [('approval_escalated_to_id', '=', self.env.uid)] + unchained,
+            stage_domain,
+            self._get_frozen_approval_domain() + unchained
+            + [('approval_approver_ids', 'in', list(approver_ids))],
+        ]
+        rule_domains = []
+        user_rules = self.env['sale.approval.rule'].sudo().search(
+            [('approver_id', 'in', list(approver_ids))])
+        for company in user_rules.company_id:
+            matrix = self._get_approval_matrix(company.id)
+            rule_domains += [
+                self._get_approval_tier_domain(company.id, matrix, tier)
+                for tier in matrix.tiers
+                if tier.approver_id in approver_ids and not tier.stages
+            ]
+            rule_domains += [
+                [('company_id', '=', company.id)] + condition.order_domain()
+                for condition in matrix.conditions
+                if condition.tier.approver_id in approver_ids
+                and not condition.tier.stages
+            ]
+        if rule_domains:
+            # the live rules only apply to the orders which are not frozen
+            domains.append(expression.AND([
+                self._get_frozen_approval_domain(frozen=False),
+                unchained,
+                expression.OR(rule_domains),
+            ]))
+        domain = expression.OR(domains)
+        return domain if positive else ['!'] + domain
+
+    @api.model
+    def _get_effective_approvers(self):
+        """``{approver_id: delegate_id}`` of the approvers absent today, read
+        from the cached delegation map"""
+        return self.env['sale.approval.delegation']._get_delegation_map(
+            fields.Date.today())
+
+    @api.model
+    def _get_effective_approver_id(self, approver_id, delegates=None):
+        """User approving in place of ``approver_id`` today"""
+        if delegates is None:
+            delegates = self._get_effective_approvers()
+        return delegates.get(approver_id, approver_id)
+
+    @api.model
+    def _get_represented_approver_ids(self):
+        """The current user and the absent approvers they stand in for"""
+        return {self.env.uid} | {
+            approver_id
+            for approver_id, delegate_id in self._get_effective_approvers().items()
+            if delegate_id == self.env.uid
+        }
+
+    @api.model
+    def _get_approval_tier_domain(self, company_id, matrix, tier):
+        """Domain of the orders of ``company_id`` falling in ``tier``"""
+        domain = [('company_id', '=', company_id)]
+        if tier.currency_id != matrix.currency_id:
+            domain.append(('currency_id', '=', tier.currency_id))
+            amount_field = 'amount_total'
+        else:
+            # orders in a currency without tiers fall back on the company
+            # ones, with their converted amount
+            own_currencies = list(matrix.currency_ids - {matrix.currency_id})
+            if own_currencies:
+                domain.append(('currency_id', 'not in', own_currencies))
+            amount_field = 'approval_amount'
+        domain.append((amount_field, '>=', tier.min_amount))
+        if tier.max_amount is not None:
+            domain.append((amount_field, '<=', tier.max_amount))
+        return domain
 
     
+    @instrumented
     def action_confirm(self):
-        """Override to add approval logic"""
-        for order in self:
-            # Check if approval is enabled and required
-            if order.approval_required and order.state == 'draft':
-                # Set to approval state instead of confirming
-                order.write({'state': 'to_approve'})
-                
-                # Send notification to approver
-                order.create_approval_activity()
-                
-                return {
-                    'type': 'ir.actions.client',
-                    'tag': 'display_notification',
-                    'params': {
-                        'title': _('Approval Required'),
-                        'message': _('Order %s requires approval. Amount: %s', order.name, order.amount_total),
-                        'type': 'warning'
-                    }
-                }
-        
+        """Override to add approval logic: orders requiring approval go to the
+        approval queue, the rest of the selection is confirmed normally"""
+        self._refresh_approval_conditions()
+        to_approve = self.filtered(
+            lambda order: order.approval_required and order.state == 'draft')
+        to_confirm = self - to_approve
+
+        if to_approve:
+            # Set to approval state instead of confirming, and notify the
+            # approvers
+            to_approve._submit_for_approval()
+
         # If no approval required or already approved, confirm normally
-        return super().action_confirm()
+        res = super(SaleOrder, to_confirm).action_confirm() if to_confirm else True
+        if not to_approve:
+            return res
 
-    def button_approve(self):
-        """Method to approve the sale order and send email"""
+        if len(to_approve) == 1 and not to_confirm:
+            message = _('Order %s requires approval. Amount: %s',
+                        to_approve.name, to_approve.amount_total)
+        else:
+            message = _('%(to_approve)s order(s) sent for approval, '
+                        '%(confirmed)s order(s) confirmed.',
+                        to_approve=len(to_approve), confirmed=len(to_confirm))
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Approval Required'),
+                'message': message,
+                'type': 'warning',
+                'next': {'type': 'ir.actions.client', 'tag': 'soft_reload'},
+            }
+        }
+
+    @instrumented
+    def _submit_for_approval(self):
+        """Put the orders in the approval queue with one write, then open
+        their approval chain, log the submission and notify the approvers"""
+        __, handled = self._lock_approval_state(('draft',))
+        if handled:
+            raise UserError(_(
+                "These quotations were already sent by another user: %s",
+                ', '.join(handled.mapped('name'))))
+        # the rules fired are read before the orders are frozen on the main one
+        matches = self._get_approval_matches()
+        self._snapshot_approvals(matches)
+        self.write({
+            'state': 'to_approve',
+            'approval_request_date': fields.Datetime.now(),
+            'approval_escalation_date': False,
+            'approval_escalated_to_id': False,
+            'approval_claimed_by_id': False,
+            'approval_claim_date': False,
+        })
+        self._init_approval_stages(matches)
+        self.env['sale.approval.log']._log(self, 'submitted')
+        self._create_approval_activities()
+
+    def _snapshot_approvals(self, matches=None):
+        """Record the approval evaluation of the orders being submitted: the
+        main rule and its approver, the approvers of every rule fired and
+        the fingerprint of the lines. Once the orders are in a frozen state,
+        their approval fields are read from this snapshot and no longer
+        evaluated. The orders are written per evaluation, the fingerprints
+        stored with one UPDATE.
+
+        :param matches: optional result of ``_get_approval_matches``
+        """
+        if not self:
+            return
+        if matches is None:
+            matches = self._get_approval_matches()
+        groups = defaultdict(list)
+        for order, tiers in matches.items():
+            main = tiers[0] if tiers else None
+            groups[(
+                main.rule_id if main else False,
+                main.approver_id if main else False,
+                tuple(sorted({tier.approver_id for tier in tiers if tier.approver_id})),
+            )].append(order.id)
+        for (rule_id, approver_id, approver_ids), order_ids in groups.items():
+            self.browse(order_ids).write({
+                'approval_rule_id': rule_id,
+                'approval_approver_id': approver_id,
+                'approval_approver_ids': [Command.set(approver_ids)],
+            })
+        self.flush_recordset(['approval_lines_hash'])
+        self.env.cr.execute(SQL("""
+            UPDATE sale_order so
+               SET approval_lines_hash = fingerprint.hash
+              FROM (%s) fingerprint
+             WHERE so.id = fingerprint.order_id
+        """, self._get_approval_lines_hash_query()))
+        self.invalidate_recordset(['approval_lines_hash'])
+
+    def _get_approval_lines_hash_query(self):
+        """Query of the ``(order_id, hash)`` fingerprint of the lines of every
+        order: the amounts and products of its lines, notes and sections
+        excluded"""
+        self.env['sale.order.line'].flush_model(APPROVAL_LINE_FIELDS + ('price_total',))
+        return SQL("""
+            SELECT so.id AS order_id,
+                   md5(COALESCE(string_agg(
+                       concat_ws(':', sol.id, sol.product_id, sol.product_uom_qty,
+                                 sol.price_unit, sol.discount, sol.price_total),
+                       ',' ORDER BY sol.id), '')) AS hash
+              FROM sale_order so
+         LEFT JOIN sale_order_line sol
+                ON sol.order_id = so.id AND sol.display_type IS NULL
+             WHERE so.id IN %s
+          GROUP BY so.id
+        """, tuple(self.ids))
+
+    def _check_approval_lines(self):
+        """Send back to draft, in bulk, the orders waiting for approval or
+        approved whose lines changed since they were submitted, the
+        fingerprints being compared with one query"""
+        orders = self.filtered(
+            lambda order: order.state in RESUBMIT_STATES and order.approval_lines_hash)
+        if not orders:
+            return
+        orders.flush_recordset(['approval_lines_hash'])
+        self.env.cr.execute(SQL("""
+            SELECT so.id
+              FROM sale_order so
+              JOIN (%s) fingerprint ON fingerprint.order_id = so.id
+             WHERE so.approval_lines_hash IS DISTINCT FROM fingerprint.hash
+        """, orders._get_approval_lines_hash_query()))
+        changed = self.browse([row[0] for row in self.env.cr.fetchall()])
+        changed._reset_approval()
+
+    def _reset_approval(self):
+        """Send the orders back to draft, dropping their approval snapshot,
+        chain progress and pending approval activities; they are evaluated
+        against the live rules again and must be sent for approval again"""
+        if not self:
+            return
+        self.sudo()._get_approval_activities().unlink()
+        self.approval_stage_ids.sudo().unlink()
+        self.write({
+            'state': 'draft',
+            'approval_lines_hash': False,
+            'approval_claimed_by_id': False,
+            'approval_claim_date': False,
+        })
+        self._message_log_batch(bodies=dict.fromkeys(self.ids, _(
+            "The order lines changed after the order was sent for approval: "
+            "it is back to draft and must be sent for approval again.")))
+
+    def _init_approval_stages(self, matches=None):
+        """Copy the approval chains of the rules fired by every order into
+        its stage progress, with a single create; the first stage is opened.
+
+        An order firing several rules needs the sign-off of each of them:
+        every rule without a chain becomes a stage of its approver, opened
+        with the first stage of the chains of the others.
+
+        :param matches: optional result of ``_get_approval_matches``
+        """
+        if matches is None:
+            matches = self._get_approval_matches()
+        self.approval_stage_ids.sudo().unlink()
+        vals_list = []
+        for order, tiers in matches.items():
+            if len(tiers) > 1:
+                vals_list += [{
+                    'order_id': order.id,
+                    'name': tier.level,
+                    'sequence': 0,
+                    'approver_ids': [Command.set([tier.approver_id])],
+                    'required_count': 1,
+                    'state': 'pending',
+                } for tier in tiers if tier.approver_id and not tier.stages]
+            for index, stage in enumerate(sorted(
+                    (stage for tier in tiers for stage in tier.stages),
+                    key=lambda stage: stage.sequence)):
+                vals_list.append({
+                    'order_id': order.id,
+                    'rule_stage_id': stage.stage_id,
+                    'name': stage.name,
+                    'sequence': stage.sequence,
+                    'approver_ids': [Command.set(stage.approver_ids)],
+                    'required_count': stage.required_count,
+                    'state': 'waiting' if index else 'pending',
+                })
+        return self.env['sale.order.approval.stage'].sudo().create(vals_list)
+
+    def _get_pending_approver_ids(self, tiers, delegates):
+        """Users expected to act on every order: the approvers of its current
+        stage who did not sign it yet, else the approver of its tier
+
+        :return: ``{order_id: [user_id]}``
+        """
+        approver_ids = {}
         for order in self:
-            if not order.can_approve:
-                raise UserError(_("You don't have permission to approve this order."))
-            
-            # Approve and confirm the order
-            order.write({'state': 'sent'})
+            stages = order.approval_stage_ids.filtered(
+                lambda stage: stage.state == 'pending')
+            if stages:
+                user_ids = [
+                    user_id for user_id in stages.approver_ids.ids
+                    if user_id not in stages.approved_user_ids.ids
+                ]
+            else:
+                user_ids = [tiers[order].approver_id] if tiers[order] else []
+            approver_ids[order.id] = list(dict.fromkeys(filter(None, (
+                self._get_effective_approver_id(user_id, delegates)
+                for user_id in user_ids))))
+        return approver_ids
 
-            
-            return True
+    @instrumented
+    def _create_approval_activities(self, approvers=None):
+        """Schedule the approval e-mail activity of every order for its
+        approvers with a single create. Activities are keyed on (type, model,
+        order, approver, approval rule), so existing ones are found with one
+        indexed lookup instead of a text search on their summary.
+
+        :param approvers: optional ``{order_id: user_id}`` overriding the
+            approvers of the order
+        :return: the created activities
+        """
+        tiers = self._get_approval_tiers()
+        approver_ids = self._get_pending_approver_ids(
+            tiers, self._get_effective_approvers())
+        for order_id, user_id in (approvers or {}).items():
+            if user_id:
+                approver_ids[order_id] = [user_id]
+        valid_approvers = self.env['res.users'].browse(
+            {user_id for user_ids in approver_ids.values() for user_id in user_ids}).exists()
+        activity_type = self.env.ref('mail.mail_activity_data_email')
+        rule_ids = [tier.rule_id for tier in tiers.values() if tier]
+        existing = {
+            (activity.res_id, activity.user_id.id, activity.sale_approval_rule_id.id)
+            for activity in self.env['mail.activity'].search_fetch([
+                ('res_model', '=', self._name),
+                ('res_id', 'in', self.ids),
+                ('user_id', 'in', valid_approvers.ids),
+                ('activity_type_id', '=', activity_type.id),
+                ('sale_approval_rule_id', 'in', rule_ids),
+            ], ['res_id', 'user_id', 'sale_approval_rule_id'])
+        }
+        model_id = self.env['ir.model']._get_id(self._name)
+        vals_list = []
+        for order in self:
+            tier = tiers[order]
+            if not tier:
+                continue
+            for approver_id in approver_ids[order.id]:
+                if approver_id not in valid_approvers.ids \
+                        or (order.id, approver_id, tier.rule_id) in existing:
+                    continue
+                vals_list.append({
+                    'activity_type_id': activity_type.id,
+                    'user_id': approver_id,
+                    'res_id': order.id,
+                    'res_model_id': model_id,
+                    'sale_approval_rule_id': tier.rule_id,
+                    'summary': _('Approve Sale Order %s', order.name),
+                    'note': _(
+                        'Sale Order Approval Required\n\n'
+                        'Order Number: %(name)s\n'
+                        'Customer: %(customer)s\n'
+                        'Amount: %(symbol)s%(amount)s\n\n'
+                        'Please review and approve this order.\n'
+                        'Email notification will be sent upon approval.',
+                        name=order.name, customer=order.partner_id.name,
+                        symbol=order.currency_id.symbol, amount=order.amount_total,
+                    ),
+                })
+        return self.env['mail.activity'].create(vals_list)
+
+    def button_approve(self):
+        """Method to approve the sale order and send email"""
+        handled = self._action_approve()
+        return self._notify_handled_elsewhere(handled)
 
     def action_cancel(self):
         """Method to cancel the sale order"""
-        self.write({'state': 'cancel'})
-        return True
+        to_reject = self.filtered(lambda order: order.state == 'to_approve')
+        handled = to_reject._action_reject()
+        (self - to_reject).write({'state': 'cancel'})
+        return self._notify_handled_elsewhere(handled)
+
+    def _notify_handled_elsewhere(self, handled):
+        """Warn about the orders another user approved or rejected first"""
+        if not handled:
+            return True
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Already Handled'),
+                'message': _('Another user already handled: %s',
+                             ', '.join(handled.mapped('name'))),
+                'type': 'warning',
+                'next': {'type': 'ir.actions.client', 'tag': 'soft_reload'},
+            }
+        }
+
+    def _lock_approval_state(self, states=('to_approve',)):
+        """Lock the rows of the orders still in ``states`` with one query, so
+        two approvers acting on the same order never both move it. Rows
+        another transaction is locking (an approver, the escalation cron, a
+        plain save) are waited for: once it ends, the row is either still
+        in ``states`` and locked here, or reported as handled.
+
+        Transactions run in REPEATABLE READ: locking a row another
+        transaction changed and committed since this one started raises a
+        serialization failure. The rows are then locked one by one, those
+        failing being reported as handled elsewhere instead of having the
+        whole request retried.
+
+        :return: ``(locked, handled)``: the orders this transaction now owns,
+            and those another user moved
+        """
+        if not self:
+            return self, self
+        self.flush_recordset(['state'])
+
+        def lock(order_ids):
+            self.env.cr.execute(SQL("""
+                SELECT id FROM sale_order
+                 WHERE id IN %s AND state IN %s
+              ORDER BY id
+                   FOR UPDATE
+            """, tuple(order_ids), tuple(states)), log_exceptions=False)
+            return {row[0] for row in self.env.cr.fetchall()}
+
+        try:
+            with self.env.cr.savepoint(flush=False):
+                locked_ids = lock(self.ids)
+        except psycopg2.errors.SerializationFailure:
+            locked_ids = set()
+            for order_id in self.ids:
+                try:
+                    with self.env.cr.savepoint(flush=False):
+                        locked_ids |= lock([order_id])
+                except psycopg2.errors.SerializationFailure:
+                    continue
+        self.invalidate_recordset(['state'])
+        locked = self.filtered(lambda order: order.id in locked_ids)
+        return locked, self - locked
+
+    def _check_can_approve(self):
+        """Raise if the current user may not approve every order of self"""
+        denied = self.filtered(lambda order: not order.can_approve)
+        if len(denied) == 1:
+            raise UserError(_("You don't have permission to approve this order."))
+        if denied:
+            raise UserError(_(
+                "You don't have permission to approve the orders %s.",
+                ', '.join(denied.mapped('name'))))
+
+    @instrumented
+    def _action_approve(self, reason=None):
+        """Approve the orders with grouped writes; orders in an approval
+        chain only sign off their current stage and are approved with the
+        last one. Only the orders still waiting for approval are moved.
+
+        :return: the orders another user already handled
+        """
+        orders, handled = self._lock_approval_state()
+        orders._check_can_approve()
+        chained = orders.filtered('approval_stage_ids')
+        completed = orders - chained
+        if chained:
+            completed |= chained._approve_current_stages(reason)
+        body = _('Quotation approved by %s.', self.env.user.name)
+        completed._approval_transition('sent', 'approved', body, reason)
+        return handled
+
+    def _approve_current_stages(self, reason=None):
+        """Sign off the current stage of every order for the current user and
+        open the next stages, set-based over the whole recordset. Raise when
+        the user is not an approver of the current stage of an order: a
+        signature only counts from the stage approvers or their delegates.
+
+        :return: the orders whose last stage is now approved
+        """
+        approver_ids = self._get_represented_approver_ids()
+        # only the approvers of a stage (or their delegates) sign it, and
+        # only once
+        signed = self.approval_stage_ids.filtered(
+            lambda stage: stage.state == 'pending'
+            and approver_ids & set(stage.approver_ids.ids)
+            and self.env.uid not in stage.approved_user_ids.ids)
+        unsigned = self - signed.order_id
+        if unsigned:
+            raise UserError(_(
+                "You are not an approver of the current approval stage of: %s",
+                ', '.join(unsigned.mapped('name'))))
+        stage_names = {stage.order_id.id: stage.name for stage in signed}
+        signed.sudo().write({'approved_user_ids': [Command.link(self.env.uid)]})
+        signed.filtered(
+            lambda stage: len(stage.approved_user_ids) >= stage.required_count,
+        ).sudo().write({'state': 'done'})
+        advanced_ids = set(self.env['sale.order.approval.stage']._advance(self.ids))
+        self._bump_approval_queue_version()
+        completed = self.filtered(lambda order: all(
+            stage.state == 'done' for stage in order.approval_stage_ids))
+        in_progress = self - completed
+        if not in_progress:
+            return completed
+
+        self.env['sale.approval.log']._log(in_progress, 'stage_approved')
+        advanced = in_progress.filtered(lambda order: order.id in advanced_ids)
+        activities = in_progress._get_approval_activities()
+        (activities.filtered(lambda activity: activity.user_id == self.env.user)
+         | activities.filtered(lambda activity: activity.res_id in advanced.ids)).unlink()
+        advanced._create_approval_activities()
+        bodies = {}
+        for order in in_progress:
+            body = _('Stage %(stage)s approved by %(user)s.',
+                     stage=stage_names.get(order.id), user=self.env.user.name)
+            bodies[order.id] = Markup('%s<br/>%s') % (body, reason) if reason else body
+        in_progress._message_log_batch(bodies=bodies)
+        return completed
+
+    @instrumented
+    def _action_reject(self, reason=None):
+        """Reject (cancel) the orders still waiting for approval with
+        grouped writes
+
+        :return: the orders another user already handled
+        """
+        orders, handled = self._lock_approval_state()
+        orders._check_can_approve()
+        body = _('Quotation rejected by %s.', self.env.user.name)
+        orders._approval_transition('cancel', 'rejected', body, reason)
+        return handled
+
+    def _approval_transition(self, state, log_action, body, reason=None):
+        """Move the orders to ``state``, close their approval activities,
+        record ``log_action`` in the approval log and post ``body`` on every
+        order in one batch"""
+        if not self:
+            return
+        self.env['sale.approval.log']._log(self, log_action)
+        self.write({
+            'state': state,
+            'approval_claimed_by_id': False,
+            'approval_claim_date': False,
+        })
+        self._get_approval_activities().unlink()
+        if reason:
+            body = Markup('%s<br/>%s') % (body, reason)
+        self._message_log_batch(bodies=dict.fromkeys(self.ids, body))
+
+    @instrumented
+    def _get_approval_activities(self):
+        """Pending approval e-mail activities and escalation reminders of the
+        orders"""
+        activity_types = self.env.ref('mail.mail_activity_data_email') | self.env.ref(
+            'sales_double_approval.mail_activity_approval_request',
+            raise_if_not_found=False)
+        return self.env['mail.activity'].search([
+            ('res_model', '=', self._name),
+            ('res_id', 'in', self.ids),
+            ('activity_type_id', 'in', activity_types.ids),
+        ])
+
+    @api.model
+    @instrumented
+    def claim_approvals(self, limit=CLAIM_BATCH_SIZE):
+        """Claim the next ``limit`` orders of the approval queue the current
+        user can approve, oldest request first. Orders claimed by another
+        approver less than CLAIM_TIMEOUT minutes ago, and rows another
+        transaction is locking, are skipped: a team can work one shared
+        queue in parallel without waiting on each other.
+
+        :return: the claimed orders
+        """
+        expired = fields.Datetime.now() - timedelta(minutes=CLAIM_TIMEOUT)
+        query = self._search([
+            ('state', '=', 'to_approve'),
+            ('can_approve', '=', True),
+            '|', '|', ('approval_claimed_by_id', '=', False),
+                      ('approval_claimed_by_id', '=', self.env.uid),
+                      ('approval_claim_date', '<', expired),
+        ], order='approval_request_date, id', limit=limit)
+        self.env.cr.execute(SQL(
+            "%s FOR UPDATE OF %s SKIP LOCKED",
+            query.select(SQL.identifier(self._table, 'id')),
+            SQL.identifier(self._table)))
+        claimed = self.browse([row[0] for row in self.env.cr.fetchall()])
+        claimed.sudo().write({
+            'approval_claimed_by_id': self.env.uid,
+            'approval_claim_date': fields.Datetime.now(),
+        })
+        return claimed
+
+    @api.model
+    def action_claim_next_approvals(self):
+        """Claim the next orders to approve and open them"""
+        claimed = self.claim_approvals()
+        if not claimed:
+            return {
+                'type': 'ir.actions.client',
+                'tag': 'display_notification',
+                'params': {
+                    'title': _('Approval Queue'),
+                    'message': _('There are no orders left for you to claim.'),
+                    'type': 'info',
+                }
+            }
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('Claimed Approvals'),
+            'res_model': self._name,
+            'view_mode': 'list,form',
+            'views': [(False, 'list'), (False, 'form')],
+            'domain': [('id', 'in', claimed.ids)],
+        }
 
     @api.model
     def create_approval_activity(self, order_id, approver_id):
         """Create single approval activity - prevents duplicates"""
         order = self.browse(order_id)
-        approver = self.env['res.users'].browse(approver_id)
-        
-        # Check for existing activities
-        domain = [
-            ('res_id', '=', order_id),
-            ('res_model', '=', 'sale.order'),
-            ('user_id', '=', approver_id),
-            ('activity_type_id.name', '=', 'Email'),
-            ('summary', 'ilike', f'approve%{order.name}%')
-        ]
-        
-        existing = self.env['mail.activity'].search(domain, limit=1)
-        
-        if not existing:
-            # Create new activity
-            self.env['mail.activity'].create({
-                'activity_type_id': self.env.ref('mail.mail_activity_data_email').id,
-                'user_id': approver_id,
-                'res_id': order_id,
-                'res_model': 'sale.order',
-                'summary': f'Approve Sale Order {order.name}',
-                'note': f'Please approve order {order.name} for {order.currency_id.symbol}{order.amount_total}'
-            })
-        
-        return existing.id if existing else True
-
+        if order._create_approval_activities({order_id: approver_id}):
+            return True
+        existing = order._get_approval_activities().filtered(
+            lambda activity: activity.user_id.id == approver_id)
+        return existing[:1].id or True
 
+    @instrumented
     def action_sent_for_approval(self):
         """Send for approval with EMAIL activity (not To-Do)"""
+        if any(order.state != 'draft' for order in self):
+            raise UserError(_("Only draft quotations can be sent for approval."))
+        self._refresh_approval_conditions()
+        if not all(self.mapped('approval_required')):
+            raise UserError(_("This quotation does not require approval."))
+
+        # Change state and schedule the EMAIL activities (not To-Do)
+        self._submit_for_approval()
+
+        # Send actual email to approver
+        self._send_approval_mails()
+        return True
+
+    @instrumented
+    def _send_approval_mails(self):
+        """Send the approval request e-mail of every order to its approver.
+
+        The mails are rendered in batch, see ``_create_approval_mails``. By
+        default they are only queued: the mail scheduler sends them in
+        batches over a shared SMTP connection. The delivery status of the
+        mail is tracked on the order.
+        """
+        get_param = self.env['ir.config_parameter'].sudo().get_param
+        if str2bool(get_param('sales_double_approval.approval_mail_digest', default='False')):
+            # approvers get the periodic digest instead
+            return
+        mail_template = self.env.ref(
+            'sales_double_approval.email_template_quotation_approval_request',
+            raise_if_not_found=False
+        )
+        if not mail_template:
+            return
+        force_send = str2bool(get_param(
+            'sales_double_approval.approval_mail_sync', default='False'))
+        approver_ids = self._get_pending_approver_ids(
+            self._get_approval_tiers(), self._get_effective_approvers())
+        approvers = self.env['res.users'].browse(
+            {user_id for user_ids in approver_ids.values() for user_id in user_ids}
+        ).exists()
+        # an order with several approvers (parallel stage) gets one mail per
+        # approver: the n-th approver of every order is rendered in round n
+        rounds = []
         for order in self:
-            if order.state != 'draft':
-                raise UserError(_("Only draft quotations can be sent for approval."))
-            if not order.approval_required:
-                raise UserError(_("This quotation does not require approval."))
-            
-            # Change state
-            order.write({'state': 'to_approve'})
-            
-            # Get approver
-            approver = order._get_approver_user()
-            
-            if approver:
-                # Use default Odoo EMAIL activity type (not To-Do)
-                order.activity_schedule(
-                    'mail.mail_activity_data_email',  # Default EMAIL activity
-                    user_id=approver.id,
-                    summary=_('Approve Sale Order %s', order.name),
-                    note=_(
-                        'Sale Order Approval Required\n\n'
-                        'Order Number: %s\n'
-                        'Customer: %s\n'
-                        'Amount: %s%s\n\n'
-                        'Please review and approve this order.\n'
-                        'Email notification will be sent upon approval.',
-                        order.name, order.partner_id.name, 
-                        order.currency_id.symbol, order.amount_total
-                    )
-                )
-                
-                # Send actual email to approver
-                try:
-                    mail_template = self.env.ref(
-                        'sales_double_approval.email_template_quotation_approval_request',
-                        raise_if_not_found=False
-                    )
-                    if mail_template:
-                        mail_template.with_context(approver_id=approver.id).send_mail(
-                            order.id, 
-                            force_send=True, 
-                            email_values={'email_to': approver.email}
-                        )
-                except Exception:
-                    pass  # Fail silently for email issues
-            
+            order_approvers = approvers.browse(approver_ids[order.id]) & approvers
+            for index, approver in enumerate(order_approvers):
+                if index == len(rounds):
+                    rounds.append({})
+                rounds[index][order.id] = approver
+        mails = self.env['mail.mail']
+        mail_ids = {}
+        for recipients in rounds:
+            try:
+                with self.env.cr.savepoint():
+                    order_mails = self._create_approval_mails(mail_template, recipients)
+            except Exception:
+                # isolate the order(s) the template fails on
+                order_mails = {}
+                for order_id, approver in recipients.items():
+                    order = self.browse(order_id)
+                    try:
+                        with self.env.cr.savepoint():
+                            order_mails.update(self._create_approval_mails(
+                                mail_template, {order_id: approver}))
+                    except Exception as error:
+                        _logger.exception("Approval e-mail of %s could not be generated", order.name)
+                        order.message_post(body=_(
+                            "The approval e-mail could not be generated: %s", error))
+            for order_id, mail in order_mails.items():
+                mail_ids[order_id] = mail.id
+                mails |= mail
+        self._set_approval_mails(mail_ids)
+        if force_send:
+            mails.send()
+        elif mails:
+            self.env.ref('mail.ir_cron_mail_scheduler_action')._trigger()
+
+    def _set_approval_mails(self, mail_ids):
+        """Link every order to its approval e-mail with one UPDATE
+
+        :param mail_ids: ``{order_id: mail_id}``
+        """
+        if not mail_ids:
+            return
+        self.flush_model(['approval_mail_id'])
+        self.env.cr.execute(SQL("""
+            UPDATE sale_order so
+               SET approval_mail_id = mail.mail_id
+              FROM (VALUES %s) AS mail(order_id, mail_id)
+             WHERE so.id = mail.order_id
+        """, SQL(", ").join(
+            SQL("(%s, %s)", order_id, mail_id) for order_id, mail_id in mail_ids.items()
+        )))
+        self.browse(mail_ids).invalidate_recordset(['approval_mail_id'])
+
+    def _create_approval_mails(self, mail_template, recipients):
+        """Render the approval request e-mail of many orders at once and
+        create their mails with a single create.
+
+        The subject, sender and body of all the orders are rendered with one
+        ``_render_field`` call each, the orders, companies and currencies
+        being prefetched beforehand. The template body only holds the
+        per-order part of the mail: the styled shell around it is rendered
+        once per company and language (see ``_get_approval_mail_shell``).
+
+        :param recipients: ``{order_id: approver}``, at most one approver
+            per order
+        :return: ``{order_id: mail.mail}``
+        """
+        orders = self.browse(list(recipients))
+        orders.fetch(['name', 'partner_id', 'user_id', 'amount_total',
+                      'currency_id', 'company_id', 'date_order'])
+        orders.company_id.fetch(['name', 'email', 'phone', 'website', 'write_date'])
+        orders.currency_id.fetch(['symbol', 'position', 'decimal_places'])
+        generated_on = fields.Datetime.context_timestamp(self, fields.Datetime.now())
+        add_context = {
+            'approver_names': {
+                order_id: approver.name for order_id, approver in recipients.items()},
+            'approval_mail_date': generated_on.strftime('%d/%m/%Y'),
+        }
+        render = functools.partial(
+            mail_template._render_field, res_ids=orders.ids,
+            compute_lang=True, add_context=add_context)
+        subjects = render('subject')
+        emails_from = render('email_from')
+        bodies = render('body_html', options={'post_process': True})
+        langs = mail_template._render_lang(orders.ids)
+        generated_on = generated_on.strftime('%d/%m/%Y at %H:%M')
+        vals_list = []
+        for order in orders:
+            company = order.company_id
+            header, middle, footer = self._get_approval_mail_shell(
+                company.id, langs[order.id], company.write_date)
+            vals_list.append({
+                'subject': subjects[order.id],
+                'email_from': emails_from[order.id],
+                'body_html': Markup('').join((
+                    Markup(header), bodies[order.id], Markup(middle),
+                    generated_on, Markup(footer))),
+                'recipient_ids': [Command.link(recipients[order.id].partner_id.id)],
+                'model': self._name,
+                'res_id': order.id,
+                'auto_delete': mail_template.auto_delete,
+                'mail_server_id': mail_template.mail_server_id.id,
+            })
+        mails = self.env['mail.mail'].sudo().create(vals_list)
+        return dict(zip(orders.ids, mails))
+
+    @api.model
+    @tools.ormcache('company_id', 'lang', 'write_date')
+    def _get_approval_mail_shell(self, company_id, lang, write_date):
+        """Styled shell of the approval request e-mail of a company, split
+        around the order body and the generation date. ``write_date`` is only
+        part of the cache key, so a change to the company contact details
+        renders the shell again.
+
+        :return: ``(header, middle, footer)`` html strings
+        """
+        html = self.env['ir.qweb'].with_context(lang=lang)._render(
+            'sales_double_approval.approval_mail_layout', {
+                'company': self.env['res.company'].sudo().browse(company_id),
+                'body': Markup(APPROVAL_MAIL_BODY),
+                'generated_on': Markup(APPROVAL_MAIL_DATE),
+            })
+        header, rest = str(html).split(APPROVAL_MAIL_BODY)
+        middle, footer = rest.split(APPROVAL_MAIL_DATE)
+        return header, middle, footer
+
+    @api.model
+    @instrumented
+    def _cron_send_approval_digest(self):
+        """Digest mode: send every approver one e-mail listing all the
+        quotations waiting for their approval, chain stages and escalations
+        included"""
+        get_param = self.env['ir.config_parameter'].sudo().get_param
+        if not str2bool(get_param('sales_double_approval.approval_mail_digest', default='False')):
+            return
+        mail_template = self.env.ref(
+            'sales_double_approval.email_template_approval_digest',
+            raise_if_not_found=False
+        )
+        if not mail_template:
+            return
+        orders = self.search([('state', '=', 'to_approve')], order='date_order, id')
+        # the approvers of the current chain stage, or of the tier, and the
+        # user the request was escalated to
+        approver_ids = orders._get_pending_approver_ids(
+            orders._get_approval_tiers(), self._get_effective_approvers())
+        order_ids_by_approver = defaultdict(list)
+        for order in orders:
+            user_ids = approver_ids[order.id] + [order.approval_escalated_to_id.id]
+            for user_id in dict.fromkeys(filter(None, user_ids)):
+                order_ids_by_approver[user_id].append(order.id)
+        approvers = self.env['res.users'].browse(order_ids_by_approver).exists()
+        for approver in approvers:
+            mail_template.with_context(
+                digest_order_ids=order_ids_by_approver[approver.id],
+            ).send_mail(approver.id)
+        if approvers:
+            self.env.ref('mail.ir_cron_mail_scheduler_action')._trigger()
+
+    def action_retry_approval_mail(self):
+        """Put the failed approval e-mails back in the outgoing queue"""
+        failed = self.filtered(
+            lambda order: order.approval_mail_id.state == 'exception')
+        if not failed:
             return True
+        failed.approval_mail_id.mark_outgoing()
+        failed.flush_recordset(['approval_mail_retry_count'])
+        self.env.cr.execute(SQL("""
+            UPDATE sale_order
+               SET approval_mail_retry_count = COALESCE(approval_mail_retry_count, 0) + 1
+             WHERE id IN %s
+        """, tuple(failed.ids)))
+        failed.invalidate_recordset(['approval_mail_retry_count'])
+        self.env.ref('mail.ir_cron_mail_scheduler_action')._trigger()
+        return True
 
-    def _get_approver_user(self):
-        """Get the appropriate approver based on amount range - FIXED"""
-        range_info = self._get_amount_range_info(self.amount_total)
-        approver_id = range_info.get('approver')
-        
-        if approver_id:
-            try:
-                approver = self.env['res.users'].browse(int(approver_id))
-                if approver.exists():
-                    return approver
-            except (ValueError, TypeError):
-                pass
-        
-        return self.env['res.users']  
+    @api.model
+    @instrumented
+    def _cron_retry_approval_mails(self, max_retries=MAX_MAIL_RETRIES):
+        """Retry the failed approval e-mails of the orders still waiting for
+        approval, at most ``max_retries`` times each"""
+        self.search([
+            ('state', '=', 'to_approve'),
+            ('approval_mail_id.state', '=', 'exception'),
+            ('approval_mail_retry_count', '<', max_retries),
+        ]).action_retry_approval_mail()
+
+    @api.model
+    @instrumented
+    def _cron_escalate_approvals(self, batch_size=ESCALATION_BATCH_SIZE,
+                                 time_limit=None):
+        """Escalate the approval requests left unanswered longer than the
+        delay of the 'Sale Order Approval Request' activity type.
 
+        The queue is walked in id order with keyset pagination, committing
+        after every batch so no lock outlives it. The run stops after
+        ``time_limit`` seconds (see ``_get_escalation_time_limit`` by
+        default) and re-triggers the cron for the remaining orders, which
+        are still overdue and picked up again.
+        """
+        activity_type = self.env.ref(
+            'sales_double_approval.mail_activity_approval_request',
+            raise_if_not_found=False)
+        if not activity_type:
+            return
+        overdue_before = fields.Datetime.now() - relativedelta(
+            **{activity_type.delay_unit: activity_type.delay_count})
+        domain = [
+            ('state', '=', 'to_approve'),
+            ('approval_request_date', '<', overdue_before),
+            '|', ('approval_escalation_date', '=', False),
+                 ('approval_escalation_date', '<', overdue_before),
+        ]
+        if time_limit is None:
+            time_limit = self._get_escalation_time_limit()
+        started = time.monotonic()
+        last_id = 0
+        while True:
+            orders = self.search(domain + [('id', '>', last_id)], order='id', limit=batch_size)
+            if not orders:
+                return
+            orders._escalate_approvals(activity_type)
+            last_id = orders[-1].id
+            self.env.cr.commit()
+            self.env.invalidate_all()
+            if time.monotonic() - started > time_limit:
+                _logger.info("Approval escalation stopped after order %s, "
+                             "resuming in a new run", last_id)
+                self.env.ref('sales_double_approval.ir_cron_escalate_approvals')._trigger()
+                return
+
+    @api.model
+    def _get_escalation_time_limit(self):
+        """Seconds an escalation run may last: a share of the real time limit
+        of the cron workers, so the run stops well before the worker is
+        killed, and at most ESCALATION_TIME_LIMIT"""
+        limit = config.get('limit_time_real_cron', -1)
+        if limit is None or limit < 0:
+            # the cron workers follow the limit of the other requests
+            limit = config.get('limit_time_real') or 0
+        if limit <= 0:
+            return ESCALATION_TIME_LIMIT
+        return min(limit * ESCALATION_TIME_SHARE, ESCALATION_TIME_LIMIT)
 
+    def _get_escalation_approvers(self, tiers, matrices):
+        """User every overdue order is escalated to: the approver (or their
+        delegate) of the next tier above the one currently handling it, or
+        None when it already reached the top of the matrix
+
+        :return: ``{order_id: user_id or None}``
+        """
+        delegates = self._get_effective_approvers()
+        approvers = {}
+        for order in self:
+            tier = tiers[order]
+            if not tier:
+                approvers[order.id] = None
+                continue
+            matrix = matrices[order.company_id.id or self.env.company.id]
+            chain = []
+            for approver_id in [tier.approver_id] + [
+                    upper.approver_id for upper in matrix.escalation_tiers(tier)]:
+                approver_id = self._get_effective_approver_id(approver_id, delegates)
+                if approver_id and approver_id not in chain:
+                    chain.append(approver_id)
+            current = order.approval_escalated_to_id.id \
+                or self._get_effective_approver_id(tier.approver_id, delegates)
+            index = chain.index(current) + 1 if current in chain else len(chain)
+            approvers[order.id] = chain[index] if index < len(chain) else None
+        return approvers
+
+    @instrumented
+    def _escalate_approvals(self, activity_type):
+        """Reassign the overdue orders to their escalation approver and remind
+        whoever handles them now, with grouped writes and one activity create"""
+        now = fields.Datetime.now()
+        matrices = self._get_approval_matrices()
+        tiers = self._get_approval_tiers(matrices)
+        targets = self._get_escalation_approvers(tiers, matrices)
+        valid_user_ids = set(self.env['res.users'].browse(
+            set(filter(None, targets.values()))).exists().ids)
+
+        order_ids_by_target = defaultdict(list)
+        for order_id, user_id in targets.items():
+            if user_id in valid_user_ids:
+                order_ids_by_target[user_id].append(order_id)
+        email_type = self.env.ref('mail.mail_activity_data_email')
+        activities = self._get_approval_activities().filtered(
+            lambda activity: activity.activity_type_id == email_type)
+        for user_id, order_ids in order_ids_by_target.items():
+            activities.filtered(lambda activity: activity.res_id in order_ids).write(
+                {'user_id': user_id})
+            self.browse(order_ids).write({
+                'approval_escalated_to_id': user_id,
+                'approval_escalation_date': now,
+            })
+        escalated = self.browse([
+            order_id for order_ids in order_ids_by_target.values() for order_id in order_ids])
+        (self - escalated).write({'approval_escalation_date': now})
+
+        # Remind the user now in charge of every order, once
+        delegates = self._get_effective_approvers()
+        reminded = {
+            order: order.approval_escalated_to_id.id or (
+                tiers[order] and self._get_effective_approver_id(
+                    tiers[order].approver_id, delegates))
+            for order in self
+        }
+        existing = {
+            (activity.res_id, activity.user_id.id)
+            for activity in self.env['mail.activity'].search_fetch([
+                ('res_model', '=', self._name),
+                ('res_id', 'in', self.ids),
+                ('activity_type_id', '=', activity_type.id),
+            ], ['res_id', 'user_id'])
+        }
+        model_id = self.env['ir.model']._get_id(self._name)
+        deadline = activity_type._get_date_deadline()
+        self.env['mail.activity'].create([{
+            'activity_type_id': activity_type.id,
+            'user_id': user_id,
+            'res_id': order.id,
+            'res_model_id': model_id,
+            'date_deadline': deadline,
+            'summary': _('Overdue approval: %s', order.name),
+        } for order, user_id in reminded.items()
+            if user_id and (order.id, user_id) not in existing])
+
+        if escalated:
+            escalated._message_log_batch(bodies={
+                order.id: _('Approval request overdue, escalated to %s.',
+                            order.approval_escalated_to_id.name)
+                for order in escalated
+            })
+
+    def _get_approver_user(self):
+        """Get the appropriate approver based on amount range, or their
+        delegate when they are absent"""
+        tier = self._get_approval_tiers()[self]
+        if tier and tier.approver_id:
+            approver = self.env['res.users'].browse(
+                self._get_effective_approver_id(tier.approver_id))
+            if approver.exists():
+                return approver
+        return self.env['res.users']
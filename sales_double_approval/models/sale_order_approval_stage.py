@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    OpenERP, Open Source Management Solution
+#    Copyright (C) Wan Buffer Solution (<https://wanbuffer.com/>).
+#
+#    For Module Support : info@wanbuffer.com or Call : +91 9638442270
+#
+##############################################################################
+
+from odoo import api, fields, models, tools
+from odoo.tools import SQL
+
+
+class SaleOrderApprovalStage(models.Model):
+    """Progress of an order through one stage of its approval chain. The
+    stages are copied from the rule when the order is sent for approval,
+    so editing a chain does not affect the orders already in it."""
+    _name = 'sale.order.approval.stage'
+    _description = "Sale Order Approval Stage Progress"
+    _order = 'order_id, sequence, id'
+
+    order_id = fields.Many2one(
+        'sale.order', string="Order", required=True, index=True,
+        ondelete='cascade')
+    rule_stage_id = fields.Many2one(
+        'sale.approval.rule.stage', string="Rule Stage", ondelete='set null')
+    name = fields.Char(string="Stage", required=True)
+    sequence = fields.Integer(string="Sequence", required=True)
+    approver_ids = fields.Many2many(
+        'res.users', 'sale_order_approval_stage_approver_rel',
+        'stage_id', 'user_id', string="Approvers")
+    required_count = fields.Integer(string="Required Approvals", required=True)
+    approved_user_ids = fields.Many2many(
+        'res.users', 'sale_order_approval_stage_approved_rel',
+        'stage_id', 'user_id', string="Approved By")
+    state = fields.Selection([
+        ('waiting', 'Waiting'),
+        ('pending', 'To Approve'),
+        ('done', 'Approved'),
+    ], string="Status", required=True, default='waiting')
+
+    def init(self):
+        """Partial index on the stages waiting for a sign-off"""
+        tools.create_index(
+            self._cr, 'sale_order_approval_stage_pending_index', self._table,
+            ['order_id'], where="state = 'pending'")
+
+    @api.model
+    def _advance(self, order_ids):
+        """Open the next stage of every order of ``order_ids`` whose current
+        stage is complete, with a single UPDATE.
+
+        :return: ids of the orders that moved to a new stage
+        """
+        if not order_ids:
+            return []
+        self.flush_model(['order_id', 'sequence', 'state'])
+        self.env.cr.execute(SQL("""
+            UPDATE sale_order_approval_stage stage
+               SET state = 'pending'
+              FROM (SELECT DISTINCT ON (order_id) id
+                      FROM sale_order_approval_stage
+                     WHERE order_id IN %(order_ids)s
+                       AND state = 'waiting'
+                       AND order_id NOT IN (SELECT order_id
+                                              FROM sale_order_approval_stage
+                                             WHERE order_id IN %(order_ids)s
+                                               AND state = 'pending')
+                  ORDER BY order_id, sequence, id) next
+             WHERE stage.id = next.id
+         RETURNING stage.order_id
+        """, order_ids=tuple(order_ids)))
+        advanced_ids = [row[0] for row in self.env.cr.fetchall()]
+        self.invalidate_model(['state'])
+        return advanced_ids
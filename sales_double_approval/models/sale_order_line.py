@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    OpenERP, Open Source Management Solution
+#    Copyright (C) Wan Buffer Solution (<https://wanbuffer.com/>).
+#
+#    For Module Support : info@wanbuffer.com or Call : +91 9638442270
+#
+##############################################################################
+
+from odoo import api, models
+
+from .sale_order import APPROVAL_LINE_FIELDS
+
+
+class SaleOrderLine(models.Model):
+    """Send the orders submitted for approval back to draft when their lines
+    change, see ``sale.order._check_approval_lines``"""
+    _inherit = 'sale.order.line'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        lines.order_id._check_approval_lines()
+        return lines
+
+    def write(self, vals):
+        res = super().write(vals)
+        if not set(APPROVAL_LINE_FIELDS).isdisjoint(vals):
+            self.order_id._check_approval_lines()
+        return res
+
+    def unlink(self):
+        orders = self.order_id
+        res = super().unlink()
+        orders.exists()._check_approval_lines()
+        return res
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    OpenERP, Open Source Management Solution
+#    Copyright (C) Wan Buffer Solution (<https://wanbuffer.com/>).
+#
+#    For Module Support : info@wanbuffer.com or Call : +91 9638442270
+#
+##############################################################################
+
+from odoo import Command
+from odoo.tests import TransactionCase, new_test_user
+
+
+class SaleApprovalCommon(TransactionCase):
+    """Approvers, customer and tax-free product of the approval tests, on a
+    company with double validation and no approval rule: every suite sets
+    up its own tiers with ``_create_rules``"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.approver = new_test_user(
+            cls.env, login='sale_approval_approver',
+            groups='sales_team.group_sale_salesman_all_leads',
+            email='approver@example.com')
+        cls.other_approver = new_test_user(
+            cls.env, login='sale_approval_other_approver',
+            groups='sales_team.group_sale_salesman_all_leads',
+            email='other.approver@example.com')
+        cls.partner = cls.env['res.partner'].create({'name': 'Approval Customer'})
+        cls.product = cls.env['product.product'].create({
+            'name': 'Approval Product',
+            'list_price': 1.0,
+            'taxes_id': [Command.clear()],
+        })
+        cls.company = cls.env.company
+        cls.company.so_double_validation = True
+        cls.env['sale.approval.rule'].search(
+            [('company_id', '=', cls.company.id)]).action_archive()
+
+    @classmethod
+    def _create_rules(cls, tiers):
+        """Amount rules in the company currency
+
+        :param tiers: ``(name, min_amount, max_amount, approver)`` tuples
+        """
+        return cls.env['sale.approval.rule'].create([{
+            'name': name,
+            'company_id': cls.company.id,
+            'currency_id': cls.company.currency_id.id,
+            'min_amount': min_amount,
+            'max_amount': max_amount,
+            'approver_id': approver.id,
+        } for name, min_amount, max_amount, approver in tiers])
+
+    @classmethod
+    def _create_orders(cls, amounts, **vals):
+        """One draft order of a single line per amount, created in batch"""
+        return cls.env['sale.order'].with_context(tracking_disable=True).create([{
+            **vals,
+            'partner_id': cls.partner.id,
+            'order_line': [Command.create({
+                'product_id': cls.product.id,
+                'product_uom_qty': 1.0,
+                'price_unit': amount,
+                'tax_id': [Command.clear()],
+            })],
+        } for amount in amounts])
+
+    @classmethod
+    def _create_order(cls, amount=500.0, **vals):
+        return cls._create_orders([amount], **vals)
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    OpenERP, Open Source Management Solution
+#    Copyright (C) Wan Buffer Solution (<https://wanbuffer.com/>).
+#
+#    For Module Support : info@wanbuffer.com or Call : +91 9638442270
+#
+##############################################################################
+
+from odoo.tests import BaseCase
+
+from ..models.approval_matrix import ApprovalMatrix, ApprovalTier
+
+# Company currency and a foreign currency with tiers of its own
+COMPANY = 1
+FOREIGN = 2
+
+
+def tier(rule_id, min_amount, max_amount, approver_id=10, currency_id=COMPANY):
+    name = 'Rule %s' % rule_id
+    return ApprovalTier(
+        rule_id, name, currency_id, min_amount, max_amount, approver_id,
+        ApprovalTier.format_level(name, min_amount, max_amount))
+
+
+TIERS = (
+    tier(1, 100.0, 1000.0),
+    tier(2, 1001.0, 5000.0),
+    tier(3, 5001.0, None),
+)
+FOREIGN_TIER = tier(4, 200.0, None, currency_id=FOREIGN)
+
+# (case, tiers before, tiers after, expected changed bands)
+CHANGED_BANDS = (
+    ('unchanged', TIERS, TIERS, {}),
+    ('split', (tier(1, 100.0, 5000.0), TIERS[2]), TIERS,
+     {COMPANY: [(100.0, 5000.0)]}),
+    ('merge', TIERS, (tier(1, 100.0, 5000.0), TIERS[2]),
+     {COMPANY: [(100.0, 5000.0)]}),
+    ('approver', TIERS, (TIERS[0], TIERS[1]._replace(approver_id=11), TIERS[2]),
+     {COMPANY: [(1001.0, 5000.0)]}),
+    ('open-ended approver', TIERS, TIERS[:2] + (TIERS[2]._replace(approver_id=11),),
+     {COMPANY: [(5001.0, None)]}),
+    ('disjoint changes', TIERS,
+     (TIERS[0]._replace(approver_id=11), TIERS[1], TIERS[2]._replace(approver_id=11)),
+     {COMPANY: [(100.0, 1000.0), (5001.0, None)]}),
+    ('removed', TIERS, TIERS[:2], {COMPANY: [(5001.0, None)]}),
+    ('currency added', TIERS, TIERS + (FOREIGN_TIER,), {FOREIGN: None}),
+    ('currency removed', TIERS + (FOREIGN_TIER,), TIERS, {FOREIGN: None}),
+    ('foreign approver', TIERS + (FOREIGN_TIER,),
+     TIERS + (FOREIGN_TIER._replace(approver_id=11),),
+     {FOREIGN: [(200.0, None)]}),
+)
+
+
+class TestApprovalMatrix(BaseCase):
+    """Compiled approval matrix, without database"""
+
+    def test_changed_bands(self):
+        for case, before, after, expected in CHANGED_BANDS:
+            with self.subTest(case=case):
+                self.assertEqual(
+                    ApprovalMatrix(COMPANY, after).changed_bands(
+                        ApprovalMatrix(COMPANY, before)),
+                    expected)
+
+    def test_changed_bands_match(self):
+        """Outside the changed bands, both matrices match the same tier"""
+        amounts = (50.0, 100.0, 999.0, 1000.0, 1001.0, 3000.0, 5000.0, 5001.0, 1e9)
+        for case, before, after, __ in CHANGED_BANDS:
+            old, new = ApprovalMatrix(COMPANY, before), ApprovalMatrix(COMPANY, after)
+            bands = new.changed_bands(old)
+            for currency_id in (COMPANY, FOREIGN):
+                currency_bands = bands.get(currency_id, [])
+                if currency_bands is None:
+                    continue
+                for amount in amounts:
+                    if any(min_amount <= amount and (max_amount is None or amount <= max_amount)
+                           for min_amount, max_amount in currency_bands):
+                        continue
+                    with self.subTest(case=case, currency=currency_id, amount=amount):
+                        self.assertEqual(
+                            new.match(amount, currency_id), old.match(amount, currency_id))
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    OpenERP, Open Source Management Solution
+#    Copyright (C) Wan Buffer Solution (<https://wanbuffer.com/>).
+#
+#    For Module Support : info@wanbuffer.com or Call : +91 9638442270
+#
+##############################################################################
+
+import logging
+import math
+import os
+import time
+from contextlib import contextmanager
+
+from odoo.models import PREFETCH_MAX
+from odoo.tests import tagged
+
+from .common import SaleApprovalCommon
+
+_logger = logging.getLogger(__name__)
+
+# Orders generated for the recordset-wide measures, at production scale;
+# lower it for a quick run with e.g. SALE_APPROVAL_BENCH_ORDERS=1000
+BENCH_ORDERS = int(os.environ.get('SALE_APPROVAL_BENCH_ORDERS', 10000))
+# Orders per batch for the workflow actions, which are also run on twice
+# as many orders: their query count must not depend on the batch size
+ACTION_BATCH = 20
+# Amounts cycling over: tier 1, tier 2, tier 3, no approval
+AMOUNTS = (500.0, 3000.0, 8000.0, 50.0)
+
+
+# out of the standard runs: --test-tags sale_approval_benchmark
+@tagged('post_install', '-at_install', '-standard', 'sale_approval_benchmark')
+class TestApprovalPerformance(SaleApprovalCommon):
+    """Timings and query counts of the approval hot paths"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._create_rules([
+            ('Tier 1', 100.0, 1000.0, cls.approver),
+            ('Tier 2', 1001.0, 5000.0, cls.approver),
+            ('Tier 3', 5001.0, 0.0, cls.approver),
+        ])
+        cls.orders = cls._create_orders(cls._cycle(BENCH_ORDERS))
+
+    @staticmethod
+    def _cycle(count, amounts=AMOUNTS):
+        """``count`` amounts cycling over ``amounts``"""
+        return [amounts[index % len(amounts)] for index in range(count)]
+
+    @staticmethod
+    def _prefetch_batches(count):
+        return math.ceil(count / PREFETCH_MAX)
+
+    @contextmanager
+    def _benchmark(self, name, count):
+        start = time.perf_counter()
+        queries = self.cr.sql_log_count
+        yield
+        _logger.info(
+            "%s: %d records, %.3fs, %d queries", name, count,
+            time.perf_counter() - start, self.cr.sql_log_count - queries)
+
+    def _assertFlatQueryCount(self, name, prepare, action):
+        """Run ``action`` on the records ``prepare(count)`` returns for
+        ACTION_BATCH then twice as many records, after a warm-up run filling
+        the caches, and check both runs cost the same number of queries
+
+        :return: the results of the measured runs
+        """
+        action(prepare(ACTION_BATCH))
+        counts, results = [], []
+        for count in (ACTION_BATCH, 2 * ACTION_BATCH):
+            records = prepare(count)
+            self.env.flush_all()
+            self.env.invalidate_all()
+            queries = self.cr.sql_log_count
+            with self._benchmark(name, count):
+                results.append(action(records))
+            counts.append(self.cr.sql_log_count - queries)
+        self.assertEqual(
+            counts[0], counts[1],
+            "%s: %d queries for %d records, %d for %d" % (
+                name, counts[0], ACTION_BATCH, counts[1], 2 * ACTION_BATCH))
+        return results
+
+    def _order_batches(self, submit=False):
+        """``prepare`` factory of tier 1 and 2 orders for
+        _assertFlatQueryCount, submitted for approval when ``submit``, and
+        the list of the batches it created"""
+        batches = []
+
+        def prepare(count):
+            orders = self._create_orders(self._cycle(count, (500.0, 3000.0)))
+            if submit:
+                orders.action_sent_for_approval()
+            batches.append(orders)
+            return orders
+        return prepare, batches
+
+    def test_compute_approval_required(self):
+        orders = self.orders
+        orders._get_approval_matrices()
+        self.env.invalidate_all()
+        ceiling = 2 + 2 * self._prefetch_batches(len(orders))
+        with self._benchmark('_compute_approval_required', len(orders)), \
+                self.assertQueryCount(ceiling):
+            orders._compute_approval_required()
+        self.assertEqual(
+            len(orders.filtered('approval_required')),
+            len([index for index in range(len(orders))
+                 if AMOUNTS[index % len(AMOUNTS)] >= 100.0]))
+
+    def test_compute_can_approve(self):
+        orders = self.orders.with_user(self.approver)
+        orders._get_approval_matrices()
+        self.approver.has_group('sales_team.group_sale_manager')
+        self.env.invalidate_all()
+        # the orders, then their approval stages, per prefetch batch
+        ceiling = 2 + 2 * self._prefetch_batches(len(orders))
+        with self._benchmark('_compute_can_approve', len(orders)), \
+                self.assertQueryCount(ceiling):
+            values = orders.mapped('can_approve')
+        self.assertTrue(all(values))
+
+    def test_list_render(self):
+        self.orders[:ACTION_BATCH * 6].with_context(
+            tracking_disable=True).write({'state': 'to_approve'})
+        SaleOrder = self.env['sale.order'].with_user(self.approver)
+        specification = {
+            field: {} for field in (
+                'name', 'date_order', 'partner_id', 'user_id', 'amount_total',
+                'currency_id', 'state', 'approval_level', 'can_approve')
+        }
+        results = self._assertFlatQueryCount(
+            'action_to_approve_quotation list', lambda count: count,
+            lambda limit: SaleOrder.web_search_read(
+                [('state', '=', 'to_approve')], specification, limit=limit))
+        self.assertEqual(
+            [len(result['records']) for result in results],
+            [ACTION_BATCH, 2 * ACTION_BATCH])
+
+    def test_action_confirm(self):
+        prepare, batches = self._order_batches()
+        self._assertFlatQueryCount(
+            'action_confirm', prepare, lambda orders: orders.action_confirm())
+        self.assertEqual(
+            set(self.env['sale.order'].concat(*batches).mapped('state')),
+            {'to_approve'})
+
+    def test_action_confirm_mixed(self):
+        orders = self._create_orders(self._cycle(ACTION_BATCH))
+        with self._benchmark('action_confirm (mixed)', len(orders)):
+            orders.action_confirm()
+        self.assertEqual(
+            orders.filtered('approval_required').mapped('state'),
+            ['to_approve'] * len(orders.filtered('approval_required')))
+        self.assertEqual(
+            set((orders - orders.filtered('approval_required')).mapped('state')),
+            {'sale'})
+
+    def test_action_sent_for_approval(self):
+        prepare, batches = self._order_batches()
+        self._assertFlatQueryCount(
+            'action_sent_for_approval', prepare,
+            lambda orders: orders.action_sent_for_approval())
+        self.assertEqual(
+            set(self.env['sale.order'].concat(*batches).mapped('state')),
+            {'to_approve'})
+
+    def test_button_approve(self):
+        prepare, batches = self._order_batches(submit=True)
+        self._assertFlatQueryCount(
+            'button_approve', prepare,
+            lambda orders: orders.with_user(self.approver).button_approve())
+        self.assertEqual(
+            set(self.env['sale.order'].concat(*batches).mapped('state')),
+            {'sent'})
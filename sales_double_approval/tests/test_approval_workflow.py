@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    OpenERP, Open Source Management Solution
+#    Copyright (C) Wan Buffer Solution (<https://wanbuffer.com/>).
+#
+#    For Module Support : info@wanbuffer.com or Call : +91 9638442270
+#
+##############################################################################
+
+from datetime import timedelta
+
+from odoo import Command, fields
+from odoo.exceptions import UserError
+from odoo.tests import HttpCase, new_test_user, tagged
+
+from .common import SaleApprovalCommon
+
+
+class ApprovalWorkflowCommon(SaleApprovalCommon):
+    """Two tiers: 100 to 1000 approved by ``approver``, above 1000 by
+    ``other_approver``"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env = cls.env(context=dict(cls.env.context, tracking_disable=True))
+        cls.rule, cls.other_rule = cls._create_rules([
+            ('Tier 1', 100.0, 1000.0, cls.approver),
+            ('Tier 2', 1001.0, 0.0, cls.other_approver),
+        ])
+
+
+@tagged('post_install', '-at_install')
+class TestApprovalWorkflow(ApprovalWorkflowCommon):
+    """Functional checks of the approval workflow"""
+
+    def test_dashboard_queue(self):
+        orders = self._create_order() | self._create_order()
+        orders.action_confirm()
+        self.assertEqual(set(orders.mapped('state')), {'to_approve'})
+        orders[1].approval_request_date = fields.Datetime.now() - timedelta(days=3)
+        dashboard = self.env['sale.approval.dashboard'].create({})
+        self.assertEqual(dashboard.queue_count, 2)
+        self.assertEqual(dashboard.age_day_count, 1)
+        self.assertEqual(dashboard.age_week_count, 1)
+        self.assertGreater(dashboard.oldest_hours, 48.0)
+
+    def test_approve_without_chain(self):
+        order = self._create_order()
+        order.action_sent_for_approval()
+        self.assertEqual(order.state, 'to_approve')
+        self.assertTrue(order.with_user(self.approver).button_approve())
+        self.assertEqual(order.state, 'sent')
+
+    def test_approve_chain(self):
+        self.env['sale.approval.rule.stage'].create([{
+            'rule_id': self.rule.id,
+            'sequence': sequence,
+            'name': name,
+            'approver_ids': [Command.set(approvers.ids)],
+            'required_count': 1,
+        } for sequence, name, approvers in (
+            (1, 'Sales', self.approver),
+            (2, 'Finance', self.other_approver),
+        )])
+        order = self._create_order()
+        order.action_sent_for_approval()
+        self.assertEqual(order.approval_stage_ids.mapped('state'), ['pending', 'waiting'])
+        self.assertFalse(order.with_user(self.other_approver).can_approve)
+
+        order.with_user(self.approver).button_approve()
+        self.assertEqual(order.state, 'to_approve')
+        self.assertEqual(order.approval_stage_ids.mapped('state'), ['done', 'pending'])
+        self.assertFalse(order.with_user(self.approver).can_approve)
+        self.assertFalse(self.env['sale.order'].with_user(self.approver).search(
+            [('id', '=', order.id), ('can_approve', '=', True)]))
+
+        order.with_user(self.other_approver).button_approve()
+        self.assertEqual(order.state, 'sent')
+        self.assertEqual(order.approval_stage_ids.mapped('state'), ['done', 'done'])
+
+    def test_approve_stage_quorum(self):
+        members = self.approver | self.other_approver | new_test_user(
+            self.env, login='sale_approval_third_approver',
+            groups='sales_team.group_sale_salesman_all_leads')
+        outsider = new_test_user(
+            self.env, login='sale_approval_outsider',
+            groups='sales_team.group_sale_salesman_all_leads')
+        self.rule.stage_ids = [Command.create({
+            'name': 'Board',
+            'approver_ids': [Command.set(members.ids)],
+            'required_count': 2,
+        })]
+        order = self._create_order()
+        order.action_sent_for_approval()
+        stage = order.approval_stage_ids
+
+        self.assertFalse(order.with_user(outsider).can_approve)
+        with self.assertRaises(UserError):
+            order.with_user(outsider).button_approve()
+        self.assertFalse(stage.approved_user_ids)
+
+        order.with_user(members[0]).button_approve()
+        self.assertEqual(stage.approved_user_ids, members[0])
+        self.assertEqual((stage.state, order.state), ('pending', 'to_approve'))
+        order.with_user(members[1]).button_approve()
+        self.assertEqual(stage.approved_user_ids, members[:2])
+        self.assertEqual((stage.state, order.state), ('done', 'sent'))
+
+    def test_approve_several_rules(self):
+        self.env['sale.approval.rule'].create({
+            'name': 'Large Discount',
+            'company_id': self.company.id,
+            'condition_type': 'line',
+            'condition_domain': "[('discount', '>', 15)]",
+            'min_amount': 0.0,
+            'approver_id': self.other_approver.id,
+        })
+        order = self._create_order()
+        order.order_line.discount = 20.0
+        order.action_sent_for_approval()
+        self.assertEqual(len(order.approval_stage_ids), 2)
+        self.assertEqual(set(order.approval_stage_ids.mapped('state')), {'pending'})
+        self.assertEqual(
+            order._get_approval_activities().user_id,
+            self.approver | self.other_approver)
+        self.assertTrue(order.with_user(self.other_approver).can_approve)
+
+        order.with_user(self.approver).button_approve()
+        self.assertEqual(order.state, 'to_approve')
+        self.assertFalse(order.with_user(self.approver).can_approve)
+        self.assertEqual(
+            order._get_approval_activities().user_id, self.other_approver)
+        order.with_user(self.other_approver).button_approve()
+        self.assertEqual(order.state, 'sent')
+
+    def _submit_overdue(self, count):
+        """Orders of the first tier sent for approval two days ago, past the
+        one day delay of the approval request activity type"""
+        orders = self._create_orders([500.0] * count)
+        orders.action_sent_for_approval()
+        orders.approval_request_date = fields.Datetime.now() - timedelta(days=2)
+        return orders
+
+    def _patch_escalation_cron(self):
+        """Keep the escalation cron in the test transaction: no commit, and
+        record its re-triggers instead of scheduling them"""
+        triggers = []
+        self.patch(self.env.cr, 'commit', lambda: None)
+        self.patch(type(self.env['ir.cron']), '_trigger',
+                   lambda cron, at=None: triggers.append(cron))
+        return triggers
+
+    def test_escalate_overdue(self):
+        triggers = self._patch_escalation_cron()
+        recent = self._create_order()
+        recent.action_sent_for_approval()
+        order = self._submit_overdue(1)
+
+        self.env['sale.order']._cron_escalate_approvals()
+        self.assertEqual(order.approval_escalated_to_id, self.other_approver)
+        escalation_date = order.approval_escalation_date
+        self.assertTrue(escalation_date)
+        self.assertFalse(recent.approval_escalation_date)
+        email_type = self.env.ref('mail.mail_activity_data_email')
+        self.assertEqual(
+            order._get_approval_activities().filtered(
+                lambda activity: activity.activity_type_id == email_type).user_id,
+            self.other_approver)
+        activities = order._get_approval_activities()
+
+        # escalated within the delay: the next run leaves it alone
+        self.env['sale.order']._cron_escalate_approvals()
+        self.assertEqual(order.approval_escalated_to_id, self.other_approver)
+        self.assertEqual(order.approval_escalation_date, escalation_date)
+        self.assertEqual(order._get_approval_activities(), activities)
+        self.assertFalse(triggers)
+
+    def test_escalate_time_limit(self):
+        triggers = self._patch_escalation_cron()
+        orders = self._submit_overdue(2)
+        self.env['sale.order']._cron_escalate_approvals(batch_size=1, time_limit=0)
+        self.assertEqual(orders[0].approval_escalated_to_id, self.other_approver)
+        self.assertFalse(orders[1].approval_escalated_to_id)
+        self.assertFalse(orders[1].approval_escalation_date)
+        self.assertEqual(
+            triggers, [self.env.ref('sales_double_approval.ir_cron_escalate_approvals')])
+
+    def test_foreign_currency_rates(self):
+        currency = self.env['res.currency'].create({
+            'name': 'SDA',
+            'symbol': 'S',
+        })
+        today = fields.Date.today()
+        # 1 company currency unit is 2 SDA, then 0.5 SDA five days ago
+        self.env['res.currency.rate'].create([{
+            'currency_id': currency.id,
+            'company_id': self.company.id,
+            'name': day,
+            'rate': rate,
+        } for day, rate in ((today - timedelta(days=10), 2.0),
+                            (today - timedelta(days=5), 0.5))])
+        pricelist = self.env['product.pricelist'].create({
+            'name': 'SDA Pricelist',
+            'currency_id': currency.id,
+        })
+        old, new = self._create_order(
+            1000.0, pricelist_id=pricelist.id,
+            date_order=fields.Datetime.now() - timedelta(days=8),
+        ) | self._create_order(1000.0, pricelist_id=pricelist.id)
+        self.assertEqual((old | new).currency_id, currency)
+
+        self.assertEqual(old.approval_amount, 500.0)
+        self.assertEqual(new.approval_amount, 2000.0)
+        self.assertEqual(old._get_amount_range_info(old.amount_total), {
+            'required': True,
+            'level': old.approval_level,
+            'approver': self.approver.id,
+        })
+        self.assertEqual(new._get_amount_range_info(new.amount_total), {
+            'required': True,
+            'level': new.approval_level,
+            'approver': self.other_approver.id,
+        })
+
+    def test_settings_empty_rows(self):
+        (self.rule | self.other_rule).action_archive()
+        self.env['res.config.settings'].create({
+            'so_approval': True,
+            'so_min_amount': 100.0,
+            'so_max_amount': 1000.0,
+            'approval': self.approver.id,
+            'so_min_amount2': 0.0,
+            'so_max_amount2': 0.0,
+            'so_min_amount3': 0.0,
+        }).execute()
+        rules = self.env['sale.approval.rule'].search([
+            ('company_id', '=', self.company.id),
+            ('settings_row', '!=', 0),
+        ])
+        self.assertEqual(rules.mapped('settings_row'), [1])
+        self.assertEqual((rules.min_amount, rules.max_amount), (100.0, 1000.0))
+        self.assertTrue(self._create_order(500.0).approval_required)
+        self.assertFalse(self._create_order(5000.0).approval_required)
+
+    def test_snapshot_and_lines_reset(self):
+        order = self._create_order()
+        order.action_sent_for_approval()
+        self.assertEqual(order.approval_rule_id, self.rule)
+        self.assertEqual(order.approval_approver_id, self.approver)
+        self.assertTrue(order.approval_lines_hash)
+
+        # a rule change does not move a submitted order to another approver
+        self.rule.approver_id = self.other_approver
+        self.assertEqual(order.approval_approver_id, self.approver)
+        self.assertTrue(order.with_user(self.approver).can_approve)
+        self.assertFalse(order.with_user(self.other_approver).can_approve)
+
+        # a change outside the lines keeps it waiting
+        order.client_order_ref = 'REF'
+        self.assertEqual(order.state, 'to_approve')
+
+        order.order_line.price_unit = 800.0
+        self.assertEqual(order.state, 'draft')
+        self.assertFalse(order.approval_lines_hash)
+        self.assertFalse(order.approval_stage_ids)
+        self.assertFalse(order._get_approval_activities())
+
+    def test_snapshot_empty(self):
+        self.env['sale.order']._snapshot_approvals()
+        self.env['sale.order'].action_sent_for_approval()
+
+
+@tagged('post_install', '-at_install')
+class TestApprovalApi(HttpCase, ApprovalWorkflowCommon):
+    """Outcomes of the mobile approval API"""
+
+    def test_pending_etag(self):
+        orders = self._create_order() | self._create_order(5000.0)
+        orders.action_sent_for_approval()
+        self.authenticate(self.approver.login, self.approver.login)
+        response = self.url_open('/sale_approval/api/pending')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [order['id'] for order in response.json()['orders']], orders[:1].ids)
+        etag = response.headers['ETag']
+        response = self.url_open(
+            '/sale_approval/api/pending', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_batch_outcomes(self):
+        done, handled, denied = (
+            self._create_order(), self._create_order(), self._create_order(5000.0))
+        (done | denied).action_sent_for_approval()
+        self.authenticate(self.approver.login, self.approver.login)
+        missing_id = max((done | handled | denied).ids) + 1000
+        result = self.make_jsonrpc_request('/sale_approval/api/approve', {
+            'order_ids': [done.id, handled.id, denied.id, missing_id],
+        })
+        self.assertEqual(result, {
+            'done': done.ids,
+            'pending': [],
+            'handled': handled.ids,
+            'denied': denied.ids,
+            'not_found': [missing_id],
+        })
+        self.assertEqual(done.state, 'sent')
+        self.assertEqual(denied.state, 'to_approve')
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+##############################################################################
+#
+#    OpenERP, Open Source Management Solution
+#    Copyright (C) Wan Buffer Solution (<https://wanbuffer.com/>).
+#
+#    For Module Support : info@wanbuffer.com or Call : +91 9638442270
+#
+##############################################################################
+
+import logging
+
+import psycopg2
+
+from odoo import api, fields, models, Command, _
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools import split_every
+
+_logger = logging.getLogger(__name__)
+
+# Orders approved / rejected per grouped write
+BATCH_SIZE = 200
+
+
+class SaleApprovalWizard(models.TransientModel):
+    """Approve or reject a selection of quotations at once"""
+    _name = 'sale.approval.wizard'
+    _description = "Sale Order Mass Approval"
+
+    order_ids = fields.Many2many(
+        'sale.order', string="Orders",
+        default=lambda self: self._default_order_ids())
+    action = fields.Selection([
+        ('approve', 'Approve'),
+        ('reject', 'Reject'),
+    ], string="Action", required=True, default='approve')
+    reason = fields.Text(
+        string="Comment",
+        help="Logged in the chatter of every processed order.")
+    state = fields.Selection([
+        ('draft', 'Draft'),
+        ('done', 'Done'),
+    ], string="Status", default='draft')
+    line_ids = fields.One2many(
+        'sale.approval.wizard.line', 'wizard_id', string="Results")
+    done_count = fields.Integer(
+        string="Processed", compute='_compute_counts')
+    skipped_count = fields.Integer(
+        string="Skipped", compute='_compute_counts')
+    failed_count = fields.Integer(
+        string="Failed", compute='_compute_counts')
+
+    @api.model
+    def _default_order_ids(self):
+        if self.env.context.get('active_model') != 'sale.order':
+            return False
+        return [Command.set(self.env.context.get('active_ids', []))]
+
+    @api.depends('line_ids.status')
+    def _compute_counts(self):
+        for wizard in self:
+            statuses = wizard.line_ids.mapped('status')
+            wizard.done_count = statuses.count('done')
+            wizard.skipped_count = statuses.count('skipped')
+            wizard.failed_count = statuses.count('failed')
+
+    def action_apply(self):
+        """Approve or reject the selection in grouped writes; the orders the
+        user may not process are skipped, a failing batch is retried order by
+        order so a single bad order does not roll back the others."""
+        self.ensure_one()
+        orders = self.order_ids
+        pending = orders.filtered(lambda order: order.state == 'to_approve')
+        allowed = pending.filtered('can_approve')
+
+        results = {}
+        for order in orders - pending:
+            results[order.id] = ('skipped', _("Not waiting for approval."))
+        for order in pending - allowed:
+            results[order.id] = (
+                'skipped', _("You don't have permission to approve this order."))
+        for batch in split_every(BATCH_SIZE, allowed.ids, allowed.browse):
+            results.update(self._process_batch(batch))
+
+        self.write({
+            'state': 'done',
+            'line_ids': [Command.clear()] + [
+                Command.create({
+                    'order_id': order_id,
+                    'status': status,
+                    'message': message,
+                })
+                for order_id, (status, message) in results.items()
+            ],
+        })
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+            'name': _("Approval Results"),
+        }
+
+    def _process_batch(self, orders):
+        """Apply the action on ``orders`` inside a savepoint
+
+        :return: dict ``{order_id: (status, message)}``
+        """
+        try:
+            with self.env.cr.savepoint():
+                if self.action == 'approve':
+                    handled = orders._action_approve(self.reason)
+                else:
+                    handled = orders._action_reject(self.reason)
+        except (UserError, ValidationError, psycopg2.DatabaseError) as error:
+            if len(orders) > 1:
+                results = {}
+                for order in orders:
+                    results.update(self._process_batch(order))
+                return results
+            _logger.info("Approval of %s failed: %s", orders.name, error)
+            return {orders.id: ('failed', str(error))}
+        results = dict.fromkeys((orders - handled).ids, ('done', ''))
+        results.update(dict.fromkeys(
+            handled.ids, ('skipped', _("Already handled by another user."))))
+        return results
+
+
+class SaleApprovalWizardLine(models.TransientModel):
+    """Outcome of the mass approval for one order"""
+    _name = 'sale.approval.wizard.line'
+    _description = "Sale Order Mass Approval Result"
+
+    wizard_id = fields.Many2one(
+        'sale.approval.wizard', string="Wizard", required=True,
+        ondelete='cascade')
+    order_id = fields.Many2one('sale.order', string="Order", required=True)
+    status = fields.Selection([
+        ('done', 'Done'),
+        ('skipped', 'Skipped'),
+        ('failed', 'Failed'),
+    ], string="Status", required=True)
+    message = fields.Char(string="Message")